@@ -6,7 +6,11 @@
 # ======================================================================================================================
 
 import numpy as np
+from scipy import sparse
 import csv
+import sys
+
+from Setter_cache import Cache
 
 def npy2csv(npy_file):
     data = np.load(npy_file)
@@ -22,5 +26,23 @@ def npy2csv(npy_file):
 
     print("Convert .npy file to .csv file: {}".format(file_name))
 
+def npz2csv(npz_file):
+    data = sparse.load_npz(npz_file)
+    file_name = npz_file.split('.npz')[0] + '.csv'
+    with open(file_name, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        for i in range(data.shape[0]):
+            writer.writerow(data[i].toarray().ravel().tolist())
+
+    print("Convert .npz file to .csv file: {}".format(file_name))
+
 if __name__ == '__main__':
-    npy2csv('data/A.npy')
\ No newline at end of file
+    # python Convertor.py [npz file], A of the last used cache entry by default
+    if len(sys.argv) > 1:
+        npz2csv(sys.argv[1])
+    else:
+        cache = Cache()
+        key = cache.latest()
+        if key is None:
+            sys.exit("No cached cover A in {}".format(cache.cache_dir))
+        npz2csv(cache.path(key, 'A.npz'))
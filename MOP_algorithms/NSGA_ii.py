@@ -6,64 +6,87 @@
 # ======================================================================================================================
 import numpy as np
 import matplotlib.pyplot as plt
+import os
+import shutil
+import tempfile
 import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
 
-COLORS = ['#1a1a1a', '#404040', '#808080', '#bfbfbf']
-
-
-class Individual(object):
-    # individual unit
-    def __init__(self):
-        self.genotype = None
-        self.phenotype = None
-
-        # non-dominated sorting
-        self.rank = None
-        self.domination_count = None
-        self.dominated_solutions = set()
-
-        # crowding distance sorting
-        self.crowding_distance = None
+from Setter_bitset import pack, unpack, popcount
+from Setter_model import max_solver_greedy, lp_relaxation, cover_need, greedy_cover, prune_cover
 
-    def set_genotype(self, new_genotype):
-        self.genotype = new_genotype
+COLORS = ['#1a1a1a', '#404040', '#808080', '#bfbfbf']
+# one row per generation of NSGA_ii.evolve
+METRICS_DTYPE = np.dtype([('generation', int), ('hypervolume', float), ('front_size', int), ('evaluations', int),
+                          ('sorting_time', float), ('selection_time', float), ('variation_time', float),
+                          ('evaluation_time', float)])
 
-    def set_phenotype(self, new_phenotype):
-        self.phenotype = new_phenotype
 
 class Population(object):
-    # population unit
-    def __init__(self):
-        # a list to store individuals
-        self.population = []
-        # a multilevel list to store individuals
+    # structure of arrays: genotypes packed into uint64 words by rows, phenotypes, ranks and crowding distances,
+    # cover counts of points for incremental evaluation (None if unknown)
+    def __init__(self, genotype_num, phenotype_num=2):
+        self.genotype_num = genotype_num
+        self.genotypes = np.zeros((0, (genotype_num + 63) // 64), dtype=np.uint64)
+        self.phenotypes = np.zeros((0, phenotype_num))
+        self.counts = None
+        self.ranks = np.zeros(0, dtype=int)
+        self.crowding_distances = np.zeros(0)
+        # a list of index arrays
         self.fronts = []
+        # hashes of packed genotypes for duplicate detection
+        self.keys = set()
 
     def __len__(self):
-        return len(self.population)
-
-    def __iter__(self):
-        return self.population.__iter__()
-
-    def append(self, new_individual):
-        self.population.append(new_individual)
-
-    def extend(self, new_individuals):
-        self.population.extend(new_individuals)
+        return len(self.phenotypes)
 
-    def contains(self, new_individual):
-        if_contain = False
-        for individual in self.population:
-            if np.array_equal(new_individual.genotype, individual.genotype):
-                if_contain = True
-                break
-        return if_contain
+    def extend(self, genotypes, phenotypes, counts=None):
+        """
+        :param genotypes:       packed genotypes in shape (k, words)
+        :param phenotypes:      array in shape (k, phenotype_num)
+        :param counts:          cover counts in shape (k, point_num)
+        """
+        genotypes = np.asarray(genotypes, dtype=np.uint64).reshape(-1, self.genotypes.shape[1])
+        if len(self) == 0:
+            self.counts = counts
+        elif self.counts is not None and counts is not None:
+            self.counts = np.concatenate([self.counts, counts])
+        else:
+            self.counts = None
+        self.genotypes = np.concatenate([self.genotypes, genotypes])
+        self.phenotypes = np.concatenate([self.phenotypes, np.asarray(phenotypes, dtype=float).reshape(len(genotypes), -1)])
+        self.ranks = np.concatenate([self.ranks, np.zeros(len(genotypes), dtype=int)])
+        self.crowding_distances = np.concatenate([self.crowding_distances, np.zeros(len(genotypes))])
+        self.keys.update(genotype.tobytes() for genotype in genotypes)
+
+    def merge(self, other):
+        merged = self.take(np.arange(len(self)))
+        merged.extend(other.genotypes, other.phenotypes, other.counts)
+        return merged
+
+    def take(self, indices):
+        """
+        :param indices:         indices of individuals
+        :return: new population of the individuals with their ranks and crowding distances
+        """
+        taken = Population(self.genotype_num, self.phenotypes.shape[1])
+        taken.extend(self.genotypes[indices], self.phenotypes[indices],
+                     None if self.counts is None else self.counts[indices])
+        taken.ranks = self.ranks[indices]
+        taken.crowding_distances = self.crowding_distances[indices]
+        return taken
+
+    def contains_all(self, genotypes):
+        """
+        :param genotypes:       0-1 array in shape (k, genotype_num)
+        :return: bool mask of genotypes already in population
+        """
+        return np.array([genotype.tobytes() in self.keys for genotype in pack(genotypes)], dtype=bool)
 
     def get_phenotypes(self):
-        phenotypes = []
-        for individual in self.population:
-            phenotypes.append(individual.phenotype)
-        return np.array(phenotypes)
+        return self.phenotypes
 
     @property
     def max_phenotype(self):
@@ -84,40 +107,109 @@ class Problem(object):
         :param b:
         :param c:
         """
-        self.W = W
         self.b = b
         self.c = c
         self.genotype_num = len(c)
         self.phenotype_num = 2
         assert W.shape == (b.shape[0], c.shape[0]), "Please input compatible W, b and c"
+        # rows of W.T for changed genes, W is the csc view of the same arrays
+        # a csc W of int32 is wrapped without copy, e.g. memory-mapped by load_problem
+        self.W_T = sparse.csr_matrix(W.T, dtype=np.int32)
+        self.W = self.W_T.T
 
-    def create_individual(self):
-        individual = Individual()
+    def create_genotype(self):
         # generate a binary genotype
-        genotype = np.random.randint(100, size=self.genotype_num) // 99
-        individual.set_genotype(new_genotype=genotype)
-        phenotype = self.function(individual)
-        individual.set_phenotype(new_phenotype=phenotype)
-        return individual
-
-    def function(self, inidividual):
-        x = inidividual.genotype
-        non_cover = np.mean(np.dot(self.W, x) - self.b < 0)
-        cost = np.dot(self.c, x)
-        return np.array([non_cover, cost])
-
-    def create_population(self, population_size):
-        population = Population()
-        while len(population) < population_size:
-            individual = self.create_individual()
+        return np.random.randint(100, size=self.genotype_num) // 99
+
+    def coverage(self, genotypes):
+        """
+        cover counts by one product of W and the genotype matrix
+        :param genotypes:       0-1 array in shape (k, genotype_num)
+        :return: cover counts of points in shape (k, point_num)
+        """
+        X = np.asarray(genotypes, dtype=np.int32)
+        return np.asarray(self.W @ X.T, dtype=np.int32).T
+
+    def objectives(self, counts, genotypes):
+        n = counts.shape[1]
+        non_cover = (n - np.sum(counts >= np.ceil(self.b), axis=1)) / n
+        cost = np.asarray(genotypes, dtype=np.int32) @ self.c
+        return np.stack([non_cover, cost], axis=1)
+
+    def evaluate_changes(self, genotypes, parents, parent_counts, ratio=1 / 256):
+        """
+        evaluate genotypes from the cover counts of parents by the columns of W of changed genes only
+        :param genotypes:       0-1 array in shape (k, genotype_num)
+        :param parents:         0-1 array of parents in shape (k, genotype_num)
+        :param parent_counts:   cover counts of parents in shape (k, point_num)
+        :param ratio:           fall back to the full product if the changed columns hold more than ratio of W per genotype
+        :return: cover counts, phenotypes
+        """
+        genotypes = np.asarray(genotypes, dtype=bool)
+        rows, cols = np.divmod(np.flatnonzero(genotypes != np.asarray(parents, dtype=bool)), genotypes.shape[1])
+        if np.sum(np.diff(self.W_T.indptr)[cols]) > ratio * self.W_T.nnz * len(genotypes):
+            counts = self.coverage(genotypes)
+            return counts, self.objectives(counts, genotypes)
+        # +1 for a gene switched on, -1 for a gene switched off
+        signs = np.where(genotypes[rows, cols], 1, -1).astype(np.int32)
+        changes = sparse.csr_matrix((signs, (rows, cols)), shape=genotypes.shape)
+        counts = parent_counts + (changes @ self.W_T).toarray()
+        return counts, self.objectives(counts, genotypes)
+
+    def create_seeds(self, budget_num=10):
+        """
+        genotypes of fast heuristics: roundings of the lp relaxation by thresholds, as they are and completed to full
+        covers greedily and pruned, then greedy covers under budget_num budgets below the cheapest full cover
+        :param budget_num:      number of budgets
+        :return: 0-1 array in shape (k, genotype_num)
+        """
+        A, b, c = self.W_T, self.b, self.c
+        need = cover_need(A, b)
+        x_lp, _ = lp_relaxation(A, need, c)
+
+        seeds = []
+        for threshold in [0.1 * k for k in range(1, 10)]:
+            x = x_lp >= threshold
+            seeds.append(x)
+            residual = np.maximum(need - A.T.dot(x.astype(int)), 0)
+            seeds.append(prune_cover(A, c, need, greedy_cover(A, c, residual, x.copy())))
+
+        full_cost = min(np.sum(c[x]) for x in seeds[1::2])
+        for budget in full_cost * np.arange(1, budget_num + 1) / (budget_num + 1):
+            seeds.append(max_solver_greedy(A, b, c, budget))
+        return np.array(seeds, dtype=int)
+
+    def create_population(self, population_size, init='random', perturb_size=10, keep_counts=False):
+        """
+        :param population_size:
+        :param init:            'random' - sparse random genotypes; 'seeded' - seeds of create_seeds first,
+                                then their perturbed variants in turn
+        :param perturb_size:    number of genes flipped in a perturbed variant, drawn with replacement
+        :param keep_counts:     keep the cover counts of points for incremental evaluation
+        :return:
+        """
+        population = Population(self.genotype_num, self.phenotype_num)
+        seeds = self.create_seeds() if init == 'seeded' else np.zeros((0, self.genotype_num), dtype=int)
+        genotypes, keys = [], set()
+        trial = 0
+        while len(genotypes) < population_size:
+            if trial < len(seeds):
+                genotype = seeds[trial]
+            elif len(seeds) > 0:
+                genotype = seeds[trial % len(seeds)].copy()
+                genotype[np.random.randint(self.genotype_num, size=perturb_size)] ^= 1
+            else:
+                genotype = self.create_genotype()
+            trial += 1
             # if new individual is different from individuals in population, then add
-            if not population.contains(new_individual=individual):
-                population.append(individual)
+            if pack(genotype).tobytes() not in keys:
+                keys.add(pack(genotype).tobytes())
+                genotypes.append(genotype)
+        counts = self.coverage(genotypes)
+        population.extend(pack(genotypes), self.objectives(counts, genotypes), counts if keep_counts else None)
         return population
 
-    def epsilon_dominates(self, individual_1, individual_2, epsilon=(0, 0)):
-        phenotype_1 = individual_1.phenotype
-        phenotype_2 = individual_2.phenotype
+    def epsilon_dominates(self, phenotype_1, phenotype_2, epsilon=(0, 0)):
         epsilons = np.array(epsilon)
         # whether individual 1 dominates individual 2
         dominate_num = np.sum(phenotype_1 - (phenotype_2 + epsilons) < 0)
@@ -126,190 +218,403 @@ class Problem(object):
         else:
             return False
 
+def non_dominated_sorting(phenotypes, epsilon=(0, 0)):
+    """
+    sort phenotypes into fronts by one domination matrix, the same fronts and ranks as pairwise epsilon_dominates:
+    i counts j as dominator if j is better in some objective and i in none, a front releases the phenotypes it is
+    better than in any objective, one by one in order, and a phenotype joins the next front when its count hits 0
+    :param phenotypes:          array in shape (N, phenotype_num)
+    :param epsilon:
+    :return: ranks, fronts - list of index arrays ended by an empty one
+    """
+    phenotypes = np.asarray(phenotypes, dtype=float)
+    num = len(phenotypes)
+    # better[i, j]: i is better than j in any objective
+    better = np.any(phenotypes[:, None, :] - (phenotypes[None, :, :] + np.array(epsilon)) < 0, axis=2)
+    count = np.sum(better.T & ~better, axis=1)
+
+    ranks = np.full(num, -1)
+    front = np.flatnonzero(count == 0)
+    ranks[front] = 0
+    fronts = [front]
+    while len(front) > 0:
+        released = np.cumsum(better[front], axis=0)
+        reached = (count > 0) & (count - released[-1] <= 0)
+        candidates = np.flatnonzero(reached)
+        # position in the front of the individual whose release brings the count to 0
+        triggers = np.argmax(released[:, candidates] >= count[candidates], axis=0)
+        front = candidates[np.lexsort((candidates, triggers))]
+        count = count - released[-1]
+        ranks[front] = len(fronts)
+        fronts.append(front)
+    return ranks, fronts
+
+def crowding_distances(phenotypes, lower, upper):
+    """
+    sum over objectives of the normalized gap between the two neighbours, infinite for the boundaries
+    :param phenotypes:          phenotypes of a front in shape (k, phenotype_num)
+    :param lower:               minimum of every objective
+    :param upper:               maximum of every objective
+    :return: crowding distances
+    """
+    num, phenotype_num = phenotypes.shape
+    distances = np.zeros(num)
+    if num <= 2:
+        distances[:] = np.inf
+        return distances
+
+    scale = np.where(upper > lower, upper - lower, np.inf)
+    order = np.argsort(phenotypes, axis=0, kind='stable')
+    ordered = np.take_along_axis(phenotypes, order, axis=0)
+    gaps = np.zeros((num, phenotype_num))
+    gaps[1:-1] = (ordered[2:] - ordered[:-2]) / scale
+    gaps[[0, -1]] = np.inf
+    for i in range(phenotype_num):
+        distances[order[:, i]] += gaps[:, i]
+    return distances
+
+def hypervolume(phenotypes, reference):
+    """
+    exact area dominated by phenotypes of 2 minimized objectives and bounded by the reference point, by one sweep
+    :param phenotypes:          array in shape (N, 2)
+    :param reference:           worst value of every objective
+    :return:
+    """
+    phenotypes = np.asarray(phenotypes, dtype=float)
+    points = phenotypes[np.all(phenotypes < reference, axis=1)]
+    if len(points) == 0:
+        return 0.
+    points = points[np.lexsort((points[:, 1], points[:, 0]))]
+    # staircase of the points improving the second objective
+    best = np.minimum.accumulate(points[:, 1])
+    stairs = points[np.concatenate([[True], best[1:] < best[:-1]])]
+    widths = np.diff(np.append(stairs[:, 0], reference[0]))
+    return float(np.sum(widths * (reference[1] - stairs[:, 1])))
+
 class NSGA_ii(object):
     # main algorithm
-    def __init__(self, problem, population_size, select_size, mutate_size):
+    def __init__(self, problem, population_size, select_size, mutate_size, population=None, init='random',
+                 incremental=False):
         self.problem = problem
         self.population_size = population_size
         self.select_size = select_size
         self.mutate_size = mutate_size
+        # evaluate offspring from the cover counts of their nearest parents, which the population then carries
+        self.incremental = incremental
+
+        # number of evaluated genotypes and time spent on evaluation
+        self.evaluations = 0
+        self.evaluation_time = 0.
+        self.metrics = np.zeros(0, dtype=METRICS_DTYPE)
 
         print("==========>>> Initialize algorithm ... <<<==========")
         # initialize the first parent population and offspring population - 2n
-        self.population = self.problem.create_population(population_size=self.population_size)
+        if population is None:
+            population = self.problem.create_population(population_size=self.population_size, init=init,
+                                                        keep_counts=incremental)
+            self.evaluations += len(population)
+        if incremental and population.counts is None:
+            population.counts = self.problem.coverage(unpack(population.genotypes, self.problem.genotype_num))
+        self.population = population
         # epsilon non-dominated_sorting
         self.epsilon_non_dominated_sorting(self.population)
         # corwding distance sorting
+        bounds = self.population.min_phenotype, self.population.max_phenotype
         for front in self.population.fronts:
-            self.crowding_distance_sorting(front)
+            self.crowding_distance_sorting(self.population, front, bounds)
         # generate offspring
         self.offspring = self.generate_offspring(self.population)
 
-    def evolve(self, num_of_generations, ax):
+    def evolve(self, num_of_generations, ax=None, reference=None, patience=None, tolerance=1e-6):
+        """
+        :param num_of_generations:
+        :param ax:
+        :param reference:       reference point of the hypervolume, (1, sum of costs) by default
+        :param patience:        stop early if the hypervolume gains at most tolerance in patience generations
+        :param tolerance:       of the hypervolume normalized by the box of the reference point
+        :return: population, durations of generations; self.metrics keeps a row of METRICS_DTYPE per generation
+        """
+        if reference is None:
+            reference = (1., np.sum(self.problem.c))
+        reference = np.asarray(reference, dtype=float)
         durations = []
+        metrics = []
         for i in range(num_of_generations):
             start = time.time()
             # main loop
             # combine
-            self.population.extend(self.offspring)
+            self.population = self.population.merge(self.offspring)
             # epsilon non-dominated_sorting
             self.epsilon_non_dominated_sorting(self.population)
+            sorting_time = time.time() - start
 
-            new_population = Population()
+            fronts = self.population.fronts
+            selected = []
             front_num = 0
 
-            # corwding distance sorting
-            while len(new_population) + len(self.population.fronts[front_num]) < self.population_size:
-                self.crowding_distance_sorting(self.population.fronts[front_num])
-                new_population.extend(self.population.fronts[front_num])
+            # corwding distance sorting, objective bounds of the combined population
+            bounds = self.population.min_phenotype, self.population.max_phenotype
+            while len(selected) + len(fronts[front_num]) < self.population_size:
+                self.crowding_distance_sorting(self.population, fronts[front_num], bounds)
+                selected.extend(fronts[front_num])
                 front_num += 1
 
-            # fill up
-            self.crowding_distance_sorting(self.population.fronts[front_num])
-            new_population.extend(self.population.fronts[front_num][:self.population_size - len(new_population)])
+            # fill up by the largest crowding distances
+            front = self.crowding_distance_sorting(self.population, fronts[front_num], bounds)
+            selected.extend(front[:self.population_size - len(selected)])
 
-            self.population = new_population
+            self.population = self.population.take(np.array(selected, dtype=int))
+            selection_time = time.time() - start - sorting_time
 
             # generate new offspring
+            evaluation_time = self.evaluation_time
             self.offspring = self.generate_offspring(self.population)
+            evaluation_time = self.evaluation_time - evaluation_time
 
             duration = time.time() - start
             durations.append(duration)
-            print("==========>>> Evolution: [%d / %d] Time: %.3f sec <<<==========" % (i, num_of_generations, duration))
+            hypervolume_i = hypervolume(self.population.phenotypes, reference) / np.prod(reference)
+            metrics.append((i, hypervolume_i, min(len(fronts[0]), self.population_size), self.evaluations,
+                            sorting_time, selection_time, duration - sorting_time - selection_time - evaluation_time,
+                            evaluation_time))
+            print("==========>>> Evolution: [%d / %d] Time: %.3f sec; Sorting: %.3f sec; Hypervolume: %.4f "
+                  "<<<==========" % (i, num_of_generations, duration, sorting_time, hypervolume_i))
 
             if ax:
                 if i % 10 == 0:
                     self.plot(ax=ax, color=str(1 - i/num_of_generations))
 
+            if patience and i >= patience and metrics[i][1] - metrics[i - patience][1] <= tolerance:
+                print("==========>>> Stop: hypervolume gains at most %g in %d generations <<<==========" % (
+                    tolerance, patience))
+                break
+
+        self.metrics = np.array(metrics, dtype=METRICS_DTYPE)
+        self.sorting_durations = self.metrics['sorting_time']
         durations = np.array(durations)
 
         return self.population, durations
 
     def epsilon_non_dominated_sorting(self, population):
-        population.fronts = []
-        population.fronts.append([])
-
-        for individual in population:
-            individual.domination_count = 0
-            individual.dominated_solutions = set()
-
-            for other_individual in population:
-                if self.problem.epsilon_dominates(individual_1=individual, individual_2=other_individual):
-                    individual.dominated_solutions.add(other_individual)
-                elif self.problem.epsilon_dominates(individual_1=other_individual, individual_2=individual):
-                    individual.domination_count += 1
-
-            if individual.domination_count == 0:
-                population.fronts[0].append(individual)
-                individual.rank = 0
-
-        i = 0
-        while len(population.fronts[i]) > 0:
-            temp = []
-            for individual in population.fronts[i]:
-                for other_individual in individual.dominated_solutions:
-                    other_individual.domination_count -= 1
-                    if other_individual.domination_count == 0:
-                        other_individual.rank = i + 1
-                        temp.append(other_individual)
-            i = i + 1
-            population.fronts.append(temp)
-
-    def crowding_distance_sorting(self, front):
-        if len(front) == 1:
-            front[0].crowding_distance = self.problem.phenotype_num
-        elif len(front) >= 2:
-            for individual in front:
-                individual.crowding_distance = 0
-            for i in range(self.problem.phenotype_num):
-                if i == 0:
-                    # ascending sorted from small to big
-                    front = sorted(front, key=lambda p: p.phenotype[i])
-                    front[0].crowding_distance += self.problem.phenotype_num
-                    front[-1].crowding_distance += self.problem.phenotype_num
-                    for j in range(1, len(front) - 1):
-                        front[i].crowding_distance += (front[j - 1].crowding_distance - front[j + 1].crowding_distance) / \
-                                                      (self.population.max_phenotype[i] - self.population.min_phenotype[i])
+        population.ranks, population.fronts = non_dominated_sorting(population.get_phenotypes())
+
+    def crowding_distance_sorting(self, population, front, bounds):
+        """
+        :param population:
+        :param front:           indices of individuals in a front
+        :param bounds:          minimum and maximum phenotypes
+        :return: front sorted by crowding distance, from large to small
+        """
+        distances = crowding_distances(population.phenotypes[front], *bounds)
+        population.crowding_distances[front] = distances
         # sort front according to crowding distance
-        front = sorted(front, key=lambda p: - p.crowding_distance)
+        return front[np.argsort(- distances, kind='stable')]
+
+    def save_metrics(self, path):
+        # csv of self.metrics with a header of the field names
+        np.savetxt(path, self.metrics, delimiter=',', header=','.join(METRICS_DTYPE.names), comments='',
+                   fmt=['%d', '%.6f', '%d', '%d'] + ['%.6f'] * 4)
 
     def generate_offspring(self, population):
-        offspring = []
-        while len(offspring) < self.population_size:
+        parents = unpack(population.genotypes, self.problem.genotype_num)
+        genotypes = np.zeros((0, self.problem.genotype_num), dtype=bool)
+        nearest = np.zeros(0, dtype=int)
+        while len(genotypes) < self.population_size:
+            pair_num = (self.population_size - len(genotypes) + 1) // 2
             # select
-            parent_1 = self._select(population)
-            parent_2 = self._select(population)
-            while np.array_equal(parent_1.genotype, parent_2.genotype):
-                parent_2 = self._select(population)
+            parents_1 = self._select(population, pair_num)
+            parents_2 = self._select(population, pair_num)
+            same = np.all(population.genotypes[parents_1] == population.genotypes[parents_2], axis=1)
+            while np.any(same):
+                parents_2[same] = self._select(population, np.sum(same))
+                same = np.all(population.genotypes[parents_1] == population.genotypes[parents_2], axis=1)
 
             # crossover
-            child_1, child_2 = self._crossover(parent_1, parent_2)
+            children_1, children_2 = self._crossover(parents[parents_1], parents[parents_2])
+            # child 1 and child 2 of every pair in turn
+            children = np.stack([children_1, children_2], axis=1).reshape(2 * pair_num, -1)
 
             # mutate
-            self._mutate(child_1)
-            self._mutate(child_2)
-
-            if not population.contains(child_1):
-                phenotype_1 = self.problem.function(child_1)
-                child_1.set_phenotype(phenotype_1)
-                offspring.append(child_1)
-
-            if len(offspring) == self.population_size:
-                break
-
-            if not population.contains(child_2):
-                phenotype_2 = self.problem.function(child_2)
-                child_2.set_phenotype(phenotype_2)
-                offspring.append(child_2)
-        return offspring
-
-    def _crowding_operator(self, individual_1, individual_2):
-        if individual_1.rank < individual_2.rank or (individual_1.rank == individual_2.rank
-                                                     and individual_1.crowding_distance > individual_2.crowding_distance):
-            return True
+            self._mutate(children)
+
+            new = ~population.contains_all(children)
+            genotypes = np.concatenate([genotypes, children[new]])
+            if self.incremental:
+                # the parent with fewer different genes of every child
+                pairs = np.repeat(np.stack([parents_1, parents_2], axis=1), 2, axis=0)[new]
+                distances = popcount(pack(children[new])[:, None, :] ^ population.genotypes[pairs])
+                nearest = np.concatenate([nearest, pairs[np.arange(len(pairs)), np.argmin(distances, axis=1)]])
+
+        genotypes = genotypes[:self.population_size]
+        start = time.time()
+        if self.incremental:
+            nearest = nearest[:self.population_size]
+            counts, phenotypes = self.problem.evaluate_changes(genotypes, parents[nearest],
+                                                               population.counts[nearest])
         else:
-            return False
+            counts = self.problem.coverage(genotypes)
+            phenotypes = self.problem.objectives(counts, genotypes)
+            counts = None
+        self.evaluation_time += time.time() - start
+        self.evaluations += len(genotypes)
+        offspring = Population(self.problem.genotype_num, self.problem.phenotype_num)
+        offspring.extend(pack(genotypes), phenotypes, counts)
+        return offspring
 
-    def _select(self, population):
-        participant_indices = np.random.choice(np.arange(self.population_size), size=self.select_size)
-        participants = [population.population[i] for i in participant_indices]
-        best_one = None
-        for participant in participants:
-            if best_one == None or self._crowding_operator(participant, best_one):
-                best_one = participant
-        return best_one
-
-    def _crossover(self, individual_1, individual_2):
-        child_1 = self.problem.create_individual()
-        child_2 = self.problem.create_individual()
+    def _select(self, population, num):
+        """
+        tournaments of select_size participants
+        :param population:
+        :param num:             number of tournaments
+        :return: indices of winners
+        """
+        participants = np.random.randint(self.population_size, size=(num, self.select_size))
+        # crowding operator: the lowest rank, then the largest crowding distance, the first participant on ties
+        ranks = population.ranks[participants]
+        distances = np.where(ranks == ranks.min(axis=1, keepdims=True),
+                             population.crowding_distances[participants], - np.inf)
+        return participants[np.arange(num), np.argmax(distances, axis=1)]
+
+    def _crossover(self, genotypes_1, genotypes_2):
+        # swap the genes at num // 2 positions drawn with replacement
         num = self.problem.genotype_num
-        crossover_indices = np.random.choice(np.arange(num), size=num // 2)
-        for i in range(num):
-            if i in crossover_indices:
-                child_1.genotype[i] = individual_2.genotype[i]
-                child_2.genotype[i] = individual_1.genotype[i]
-            else:
-                child_1.genotype[i] = individual_1.genotype[i]
-                child_2.genotype[i] = individual_2.genotype[i]
-        return child_1, child_2
-
-    def _mutate(self, individual):
+        crossover_indices = np.random.randint(num, size=(len(genotypes_1), num // 2))
+        swap = np.zeros(genotypes_1.shape, dtype=bool)
+        swap[np.arange(len(genotypes_1))[:, None], crossover_indices] = True
+        children_1 = np.where(swap, genotypes_2, genotypes_1)
+        children_2 = np.where(swap, genotypes_1, genotypes_2)
+        return children_1, children_2
+
+    def _mutate(self, genotypes):
+        # flip the genes at mutate_size positions drawn with replacement, a position drawn twice is flipped back
         num = self.problem.genotype_num
-        mutate_indices = np.random.choice(np.arange(num), size=self.mutate_size)
-        for i in mutate_indices:
-            individual.genotype[i] = 1 - individual.genotype[i]
+        mutate_indices = np.random.randint(num, size=(len(genotypes), self.mutate_size))
+        flips = np.zeros(genotypes.shape, dtype=int)
+        np.add.at(flips, (np.arange(len(genotypes))[:, None], mutate_indices), 1)
+        genotypes ^= flips % 2 == 1
 
     def plot(self, ax, color=None):
         self.epsilon_non_dominated_sorting(self.population)
+        phenotypes = self.population.get_phenotypes()
         for i, front in enumerate(self.population.fronts):
-            for individual in front:
-                if color == None:
-                    ax.scatter(1 - individual.phenotype[0], individual.phenotype[1], s=5, color=COLORS[i // 4])
-                else:
-                    ax.scatter(1 - individual.phenotype[0], individual.phenotype[1], s=5, color=color)
+            if len(front) > 0:
+                ax.scatter(1 - phenotypes[front, 0], phenotypes[front, 1], s=5,
+                           color=COLORS[i // 4] if color == None else color)
+
+class Islands(object):
+    # island model: populations evolve apart in processes and exchange their best individuals by a ring
+    def __init__(self, W, b, c, island_num=4, population_size=200, select_size=20, mutate_size=20,
+                 migration_interval=10, migration_size=5, workers=None, mmap_dir='data/islands', init='random'):
+        self.island_num = island_num
+        self.population_size = population_size
+        self.select_size = select_size
+        self.mutate_size = mutate_size
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.workers = island_num if workers is None else workers
+
+        # W.T as int32 csr, b, c are saved once and memory-mapped read-only by every process, in a directory of this
+        # instance under mmap_dir which is removed by close or with the instance
+        os.makedirs(mmap_dir, exist_ok=True)
+        self.mmap_dir = tempfile.mkdtemp(dir=mmap_dir)
+        self._remove = weakref.finalize(self, shutil.rmtree, self.mmap_dir, ignore_errors=True)
+        W_T = sparse.csr_matrix(sparse.csr_matrix(W).T, dtype=np.int32)
+        for name, array in [('data', W_T.data), ('indices', W_T.indices), ('indptr', W_T.indptr), ('b', b), ('c', c)]:
+            np.save(os.path.join(self.mmap_dir, name + '.npy'), array)
+        self.problem = load_problem(self.mmap_dir)
+
+        print("==========>>> Initialize {} islands ... <<<==========".format(island_num))
+        self.islands = [self.problem.create_population(population_size, init=init) for _ in range(island_num)]
+
+    def evolve(self, num_of_generations):
+        """
+        :param num_of_generations:
+        :return: merged non-dominated population, durations of epochs
+        """
+        durations = []
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_island_worker,
+                                           initargs=(self.mmap_dir, ))
+        else:
+            _init_island_worker(self.mmap_dir)
+
+        generation = 0
+        while generation < num_of_generations:
+            start = time.time()
+            generations = min(self.migration_interval, num_of_generations - generation)
+            tasks = [(island.genotypes, island.phenotypes, generations, self.population_size, self.select_size,
+                      self.mutate_size, np.random.randint(2 ** 31)) for island in self.islands]
+            results = executor.map(_evolve_island, tasks) if executor else map(_evolve_island, tasks)
+            self.islands = [self._population(*result) for result in results]
+            generation += generations
+
+            if generation < num_of_generations:
+                self.migrate()
+
+            durations.append(time.time() - start)
+            print("==========>>> Islands: [%d / %d] Time: %.3f sec <<<==========" % (
+                generation, num_of_generations, durations[-1]))
+
+        if executor:
+            executor.shutdown()
+        return self.merge(), np.array(durations)
+
+    def close(self):
+        # remove the memory-mapped files, the instance can not evolve afterwards
+        self._remove()
+
+    def _population(self, genotypes, phenotypes, ranks, crowding_distances):
+        population = Population(self.problem.genotype_num, self.problem.phenotype_num)
+        population.extend(genotypes, phenotypes)
+        population.ranks = ranks
+        population.crowding_distances = crowding_distances
+        return population
+
+    def migrate(self):
+        # the best of island k - 1 replace the worst of island k
+        orders = [np.lexsort((- island.crowding_distances, island.ranks)) for island in self.islands]
+        migrants = [island.take(order[:self.migration_size]) for island, order in zip(self.islands, orders)]
+        for k, (island, order) in enumerate(zip(self.islands, orders)):
+            incoming = migrants[k - 1]
+            new = ~island.contains_all(unpack(incoming.genotypes, island.genotype_num))
+            kept = order[:len(island) - np.sum(new)]
+            self.islands[k] = island.take(np.sort(kept)).merge(incoming.take(np.flatnonzero(new)))
+
+    def merge(self):
+        population = self.islands[0]
+        for island in self.islands[1:]:
+            population = population.merge(island)
+        _, unique = np.unique(population.genotypes, axis=0, return_index=True)
+        population = population.take(np.sort(unique))
+        population.ranks, population.fronts = non_dominated_sorting(population.get_phenotypes())
+        return population.take(population.fronts[0])
+
+def load_problem(mmap_dir):
+    load = lambda name: np.load(os.path.join(mmap_dir, name + '.npy'), mmap_mode='r')
+    b, c = load('b'), load('c')
+    # the csr arrays of W.T are the csc arrays of W
+    W = sparse.csc_matrix((load('data'), load('indices'), load('indptr')), shape=(len(b), len(c)), copy=False)
+    return Problem(W=W, b=b, c=c)
+
+_ISLAND_WORKER = {}
+
+def _init_island_worker(mmap_dir):
+    _ISLAND_WORKER['problem'] = load_problem(mmap_dir)
+
+def _evolve_island(task):
+    genotypes, phenotypes, generations, population_size, select_size, mutate_size, seed = task
+    np.random.seed(seed)
+    problem = _ISLAND_WORKER['problem']
+    population = Population(problem.genotype_num, problem.phenotype_num)
+    population.extend(genotypes, phenotypes)
+    nsga = NSGA_ii(problem=problem, population_size=population_size, select_size=select_size,
+                   mutate_size=mutate_size, population=population)
+    population, _ = nsga.evolve(num_of_generations=generations)
+    return population.genotypes, population.phenotypes, population.ranks, population.crowding_distances
 
 if __name__ == '__main__':
-    W = np.load('A.npy').T
+    W = sparse.load_npz('A.npz').T.tocsr()
     b = np.load('b.npy')
     c = np.load('c.npy')
 
@@ -321,5 +626,3 @@ if __name__ == '__main__':
     population, times = nsga.evolve(num_of_generations=1000, ax=ax)
 
     plt.show()
-
-
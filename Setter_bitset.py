@@ -0,0 +1,144 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     Setter_bitset
+# ======================================================================================================================
+import numpy as np
+from scipy import sparse
+
+if hasattr(np, 'bitwise_count'):
+    # numpy >= 2.0
+    def popcount(words):
+        """
+        count the set bits of words along the last axis
+        :param words:           uint64 array
+        :return:
+        """
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """
+        count the set bits of words along the last axis
+        :param words:           uint64 array
+        :return:
+        """
+        octets = np.ascontiguousarray(words).view(np.uint8)
+        return _POPCOUNT_TABLE[octets].sum(axis=-1, dtype=np.int64)
+
+def pack(mask):
+    """
+    pack bool array along the last axis into uint64 words
+    :param mask:                bool array in shape (..., n)
+    :return: uint64 array in shape (..., ceil(n / 64))
+    """
+    mask = np.asarray(mask, dtype=bool)
+    n = mask.shape[-1]
+    word_num = (n + 63) // 64
+    octets = np.packbits(mask, axis=-1, bitorder='little')
+    padded = np.zeros(mask.shape[:-1] + (word_num * 8,), dtype=np.uint8)
+    padded[..., :octets.shape[-1]] = octets
+    return padded.view(np.uint64)
+
+def unpack(words, n):
+    """
+    unpack uint64 words along the last axis into bool array
+    :param words:               uint64 array in shape (..., w)
+    :param n:                   number of bits
+    :return: bool array in shape (..., n)
+    """
+    octets = np.ascontiguousarray(words).view(np.uint8)
+    return np.unpackbits(octets, axis=-1, count=n, bitorder='little').astype(bool)
+
+def demand(b):
+    """
+    pack the cover times of points into one mask per level
+    :param b:                   cover times of points
+    :return: uint64 array in shape (T + 1, w) - [points need no cover, points need 1 cover, ..., points need T covers]
+    """
+    times = np.ceil(np.asarray(b)).astype(int)
+    levels = max(times.max(initial=0), 1)
+    return pack([times <= 0] + [times == t for t in range(1, levels + 1)])
+
+def add_row(planes, row):
+    """
+    add a row to the saturating counters, planes[t] marks points covered more than t times
+    :param planes:              uint64 array in shape (..., T, w)
+    :param row:                 uint64 array in shape (w,)
+    :return: new planes
+    """
+    new_planes = planes.copy()
+    new_planes[..., 1:, :] |= planes[..., :-1, :] & row
+    new_planes[..., 0, :] |= row
+    return new_planes
+
+def satisfied(planes, demands):
+    """
+    mark points covered as many times as demanded
+    :param planes:              uint64 array in shape (..., T, w)
+    :param demands:             uint64 array in shape (T + 1, w)
+    :return: uint64 array in shape (..., w)
+    """
+    return demands[0] | np.bitwise_or.reduce(planes & demands[1:], axis=-2)
+
+class BitMatrix(object):
+    # boolean matrix with each row packed into uint64 words
+    def __init__(self, A, chunk_size=1024):
+        if sparse.issparse(A):
+            A = sparse.csr_matrix(A)
+        m, n = A.shape
+        self.shape = (m, n)
+        self.words = np.zeros((m, (n + 63) // 64), dtype=np.uint64)
+        # pack by chunks of rows so a sparse A is never fully dense
+        for i in range(0, m, chunk_size):
+            rows = A[i:i + chunk_size]
+            rows = rows.toarray() if sparse.issparse(rows) else np.asarray(rows)
+            self.words[i:i + chunk_size] = pack(rows > 0)
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    def _selected(self, x):
+        return self.words[np.flatnonzero(np.ravel(x) > 0.5)]
+
+    def union(self, x):
+        """
+        :param x:               selection of rows
+        :return: words of points covered at least once
+        """
+        return np.bitwise_or.reduce(self._selected(x), axis=0, initial=0).astype(np.uint64)
+
+    def planes(self, x, levels):
+        """
+        :param x:               selection of rows
+        :param levels:          number of saturating counters
+        :return: words of points covered more than t times for t < levels
+        """
+        planes = np.zeros((levels, self.words.shape[1]), dtype=np.uint64)
+        for row in self._selected(x):
+            planes = add_row(planes, row)
+        return planes
+
+    def cover(self, x, demands):
+        """
+        :param x:               selection of rows
+        :param demands:         demand of cover times
+        :return: words of points covered as many times as demanded
+        """
+        if len(demands) == 2:
+            return demands[0] | (self.union(x) & demands[1])
+        return satisfied(self.planes(x, len(demands) - 1), demands)
+
+    def count(self, x, demands):
+        """
+        :param x:               selection of rows
+        :param demands:         demand of cover times
+        :return: number of points covered as many times as demanded
+        """
+        return int(popcount(self.cover(x, demands)))
+
+    def cover_mask(self, x, demands):
+        return unpack(self.cover(x, demands), self.shape[1])
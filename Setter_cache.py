@@ -0,0 +1,153 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     Setter_cache
+# ======================================================================================================================
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+# files of a complete cache entry
+ENTRY_FILES = ['configs.csv', 'A.npz', 'b.npy', 'c.npy']
+
+class Cache(object):
+    # content-addressed cache of sensor candidates and cover A, b, c, evicted by least recent use
+    def __init__(self, cache_dir='data/cache', budget=2 ** 30):
+        self.cache_dir = cache_dir
+        self.budget = budget
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(obj_polygon, sensor_types, **params):
+        """
+        generate the key of layout geometry, sensor types and discretization parameters
+        :param obj_polygon:
+        :param sensor_types:
+        :param params:          grid_size, alpha_num, ...
+        :return: hex digest
+        """
+        sha = hashlib.sha1()
+        sha.update(obj_polygon.wkb)
+        sha.update(json.dumps([sorted(sensor_type.items()) for sensor_type in sensor_types]).encode())
+        sha.update(json.dumps(sorted(params.items())).encode())
+        return sha.hexdigest()
+
+    def path(self, key, file_name=''):
+        return os.path.join(self.cache_dir, key, file_name)
+
+    def exists(self, key):
+        return all(os.path.exists(self.path(key, file_name)) for file_name in ENTRY_FILES)
+
+    def touch(self, key):
+        # the modified time of an entry is its last use
+        os.makedirs(self.path(key), exist_ok=True)
+        now = time.time()
+        os.utime(self.path(key), (now, now))
+
+    def size(self, key):
+        entry = self.path(key)
+        return sum(os.path.getsize(os.path.join(entry, file_name)) for file_name in os.listdir(entry))
+
+    def evict(self, keep=None):
+        """
+        remove the least recently used entries until the cache fits the budget
+        :param keep:            key never removed
+        :return: removed keys
+        """
+        keys = sorted(os.listdir(self.cache_dir), key=lambda k: os.path.getmtime(self.path(k)))
+        sizes = {k: self.size(k) for k in keys}
+        total = sum(sizes.values())
+
+        removed = []
+        for k in keys:
+            if total <= self.budget:
+                break
+            if k == keep:
+                continue
+            shutil.rmtree(self.path(k))
+            total -= sizes[k]
+            removed.append(k)
+
+        if removed:
+            print("==========>>> Evict {} cache entries <<<==========".format(len(removed)))
+        return removed
+
+    def latest(self):
+        # key of the most recently used complete entry, None if there is none
+        keys = [k for k in os.listdir(self.cache_dir) if self.exists(k)]
+        return max(keys, key=lambda k: os.path.getmtime(self.path(k)), default=None)
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir)
+        os.makedirs(self.cache_dir)
+
+class RowCache(object):
+    # rows of cover A keyed by sensor location, type and orientation, shared by all models of a layout and grid
+    def __init__(self, cache, scope_key):
+        self.cache = cache
+        self.scope_key = scope_key
+        # rows are read on first use, a model whose cover A is cached never needs them
+        self.rows = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self.rows is not None:
+            return
+        self.rows = {}
+        file_name = self.cache.path(self.scope_key, 'rows.npz')
+        if os.path.exists(file_name):
+            data = np.load(file_name)
+            keys, indptr, indices = data['keys'], data['indptr'], data['indices']
+            for i, k in enumerate(keys):
+                self.rows[str(k)] = indices[indptr[i]:indptr[i + 1]]
+
+    @staticmethod
+    def scope(obj_polygon, **params):
+        """
+        generate the key of layout geometry and the parameters which change the rows
+        :param obj_polygon:
+        :param params:          grid_size, visible_mode
+        :return: hex digest
+        """
+        sha = hashlib.sha1()
+        sha.update(b'rows')
+        sha.update(obj_polygon.wkb)
+        sha.update(json.dumps(sorted(params.items())).encode())
+        return sha.hexdigest()
+
+    @staticmethod
+    def key(sensor):
+        config = sensor.get_config
+        return repr(tuple(config[k] for k in ['type', 'min_rho', 'max_rho', 'theta', 'isOmini', 'isThrough',
+                                              'x', 'y', 'alpha']))
+
+    def get(self, sensor):
+        """
+        :param sensor:
+        :return: indices of covered points, None if not cached
+        """
+        self._load()
+        row = self.rows.get(self.key(sensor))
+        if row is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return row
+
+    def put(self, sensor, row):
+        self._load()
+        self.rows[self.key(sensor)] = np.asarray(row, dtype=np.int32)
+
+    def save(self):
+        self._load()
+        keys = list(self.rows)
+        rows = [self.rows[k] for k in keys]
+        indptr = np.cumsum([0] + [len(row) for row in rows])
+        indices = np.concatenate(rows + [np.zeros(0, dtype=np.int32)])
+        self.cache.touch(self.scope_key)
+        np.savez(self.cache.path(self.scope_key, 'rows.npz'), keys=np.array(keys), indptr=indptr, indices=indices)
@@ -8,10 +8,13 @@ import matplotlib.pyplot as plt
 import numpy as np
 import time, os
 
-from Setter_model import model
+from Setter_model import model, VISIBLE_MODES, max_solver_dp, max_solver_greedy, min_solver_greedy, \
+    min_solver_lp_round
+from Setter_presolve import Presolve
+from Setter_cache import Cache
 from sample.Setter_sample import SENSOR_TYPES, OBJ_POLYGON
 # from sample.Setter_layout import SENSOR_TYPES, OBJ_POLYGON
-from MOP_algorithms.NSGA_ii import Problem, NSGA_ii
+from MOP_algorithms.NSGA_ii import Problem, NSGA_ii, Islands
 
 def analyse_max():
 
@@ -54,8 +57,6 @@ def analyse_max():
 
                 plt.close()
 
-            clear_tmp_data()
-
             np.save(save_path + '/' + 'times.npy', np.array(compute_times))
             np.save(save_path + '/' + 'coverage.npy', np.array(coverage_ratios))
 
@@ -92,14 +93,33 @@ def analyse_min():
 
             fig.savefig('result/g' + str(i) + 'a' + str(j) + '.png', dpi=300)
 
-            clear_tmp_data()
-
     np.save('result/times.npy', np.array(compute_times))
     np.save('result/costs.npy', np.array(costs))
 
+def report_incumbent(x, cost, lower_bound):
+    print("==========>>> Incumbent: {} cameras; cost: {:.2f}; gap: {:.2%} <<<==========".format(
+        np.sum(x), cost, (cost - lower_bound) / max(cost, 1e-12)))
+
+def analyse_anytime():
+    # rows: time limits; columns: cost, lower bound, time
+    results = []
+    for time_limit in (10, 30, 60):
+        print("==========>>> Time limit: {} sec <<<==========".format(time_limit))
+        # compute keeps only the selected sensors, the candidates are loaded from the cache again
+        setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
+                       grid_size=2,
+                       sensor_buffer=-0.1, max_dist=4, min_dist=1, alpha_num=4,
+                       cover_times=1)
+        start = time.time()
+        setter.compute(mode='min', method='ilp', time_limit=time_limit, callback=report_incumbent)
+        results.append([np.sum(setter.get_cost), setter.lower_bound, time.time() - start])
+
+    np.save('result/anytime.npy', np.array(results))
+
 def analyse_mop():
 
     compute_times = []
+    sorting_times = []
 
     for i in (5, 10, 15, 20):
         for j in (4, 6, 8):
@@ -109,9 +129,9 @@ def analyse_mop():
                            sensor_buffer=-0.1, max_dist=4, min_dist=1, alpha_num=j,
                            cover_times=1)
 
-            W = np.load('data/A.npy').T
-            b = np.load('data/b.npy')
-            c = np.load('data/c.npy')
+            W = setter.A.T.tocsr()
+            b = setter.b
+            c = setter.c
 
             fig = plt.figure(figsize=(6, 4))
             ax = fig.add_subplot(111)
@@ -122,24 +142,180 @@ def analyse_mop():
             population, _ = nsga.evolve(num_of_generations=50, ax=ax)
 
             compute_times.append(time.time() - start)
+            sorting_times.append(nsga.sorting_durations)
+            nsga.save_metrics('result/mop_metrics_g' + str(i) + 'a' + str(j) + '.csv')
 
             ax.set_xlabel("Coverage ratio")
             ax.set_ylabel("Cost")
 
             plt.savefig('result/mop_g' + str(i) + 'a' + str(j) + '.png', dpi=300)
 
-            clear_tmp_data()
-
     np.save('result/mop_times.npy', np.array(compute_times))
+    np.save('result/mop_sorting_times.npy', np.array(sorting_times))
+
+def analyse_islands():
+    setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
+                   grid_size=2,
+                   sensor_buffer=-0.1, max_dist=4, min_dist=1, alpha_num=4,
+                   cover_times=1)
+
+    # generations of all islands per second, one island per process
+    throughputs = []
+    for island_num in range(1, os.cpu_count() + 1):
+        islands = Islands(W=setter.A.T.tocsr(), b=setter.b, c=setter.c, island_num=island_num,
+                          population_size=200, select_size=20, mutate_size=20,
+                          migration_interval=10, migration_size=5)
+        start = time.time()
+        population, _ = islands.evolve(num_of_generations=50)
+        throughputs.append(island_num * 50 / (time.time() - start))
+        islands.close()
+        print("==========>>> Islands: {}; generations per second: {:.2f}; front size: {} <<<==========".format(
+            island_num, throughputs[-1], len(population)))
+
+    np.save('result/island_throughputs.npy', np.array(throughputs))
+
+def analyse_seeding():
+    setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
+                   grid_size=2,
+                   sensor_buffer=-0.1, max_dist=4, min_dist=1, alpha_num=4,
+                   cover_times=1)
+    A, b, c = setter.A, setter.b, setter.c
+    problem = Problem(W=A.T.tocsr(), b=b, c=c)
+
+    # reference point: no coverage, twice the cost of a greedy full cover
+    x, _ = min_solver_greedy(A, b, c)
+    reference = np.array([1., 2 * np.sum(c[x])])
+
+    # rows: random and seeded starts; columns: normalized hypervolume after every generation
+    num_of_generations = 100
+    hypervolumes = np.zeros((2, num_of_generations))
+    init_times = np.zeros(2)
+    for k, init in enumerate(('random', 'seeded')):
+        np.random.seed(0)
+        start = time.time()
+        nsga = NSGA_ii(problem=problem, population_size=200, select_size=20, mutate_size=20, init=init)
+        init_times[k] = time.time() - start
+        nsga.evolve(num_of_generations=num_of_generations, reference=reference)
+        hypervolumes[k] = nsga.metrics['hypervolume']
+
+        print("==========>>> Init: {}; Time: {:.3f} sec; hypervolume: {:.4f} -> {:.4f} <<<==========".format(
+            init, init_times[k], hypervolumes[k, 0], hypervolumes[k, -1]))
+
+    np.save('result/seeding_hypervolumes.npy', hypervolumes)
+    np.save('result/seeding_times.npy', init_times)
+
+def analyse_greedy():
+    setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
+                   grid_size=2,
+                   sensor_buffer=-0.1, max_dist=4, min_dist=1, alpha_num=4,
+                   cover_times=1)
+    A, b, c = setter.A, setter.b, setter.c
+    n = len(b)
+
+    budgets = np.arange(50, 1001, 50)
+    compute_times = np.zeros((len(budgets), 2))
+    coverage_ratios = np.zeros((len(budgets), 2))
+    for k, budget in enumerate(budgets):
+        for l, solver in enumerate((max_solver_dp, max_solver_greedy)):
+            start = time.time()
+            x = solver(A, b, c, budget)
+            compute_times[k, l] = time.time() - start
+            coverage_ratios[k, l] = np.sum(A.T.dot(x) - b >= 0) / n
+
+        print("==========>>> Total cost: {}; DP: {:.3f} in {:.3f} sec; Greedy: {:.3f} in {:.3f} sec <<<==========".format(
+            budget, coverage_ratios[k, 0], compute_times[k, 0], coverage_ratios[k, 1], compute_times[k, 1]))
+
+    np.save('result/greedy_times.npy', compute_times)
+    np.save('result/greedy_coverage.npy', coverage_ratios)
+
+def analyse_presolve():
+    setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
+                   grid_size=2,
+                   sensor_buffer=-0.1, max_dist=4, min_dist=1, alpha_num=4,
+                   cover_times=1)
+    A, c = setter.A, setter.c
+
+    # rows: cover times; columns: greedy and lp rounding, without and with presolve
+    compute_times = np.zeros((3, 4))
+    costs = np.zeros((3, 4))
+    for k, cover_times in enumerate(range(1, 4)):
+        b = setter.b * cover_times
+        for l, solver in enumerate((min_solver_greedy, min_solver_lp_round)):
+            start = time.time()
+            x, _ = solver(A, b, c)
+            compute_times[k, 2 * l] = time.time() - start
+            costs[k, 2 * l] = np.sum(c[x])
+
+            reduction = Presolve(A, b, c, mode='min')
+            x, _, _ = reduction.solve(solver)
+            reduction.report()
+            compute_times[k, 2 * l + 1] = reduction.presolve_time + reduction.solve_time
+            costs[k, 2 * l + 1] = np.sum(c[x])
+
+        print("==========>>> Cover times: {}; costs: {}; times: {} <<<==========".format(
+            cover_times, costs[k], np.round(compute_times[k], 3)))
+
+    np.save('result/presolve_times.npy', compute_times)
+    np.save('result/presolve_costs.npy', costs)
+
+def analyse_visible():
+    setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
+                   grid_size=0.5,
+                   sensor_buffer=-0.1, max_dist=1, min_dist=0.5, alpha_num=4,
+                   cover_times=1)
+
+    compute_times = {}
+    visible_regions = {}
+    for visible_mode in ('ray', 'sweep'):
+        start = time.time()
+        visible_regions[visible_mode] = [VISIBLE_MODES[visible_mode](sensor, setter.layout, setter.layout_edges)
+                                         for sensor in setter.sensors.get_sensors]
+        compute_times[visible_mode] = time.time() - start
+        print("==========>>> Visible mode: {}; Time: {:.3f} sec <<<==========".format(visible_mode,
+                                                                                     compute_times[visible_mode]))
+
+    # relative area difference of the ray fan against the exact sweep
+    errors = []
+    for ray_region, sweep_region in zip(visible_regions['ray'], visible_regions['sweep']):
+        if ray_region is None or sweep_region is None:
+            continue
+        errors.append(ray_region.symmetric_difference(sweep_region).area / sweep_region.area)
+    errors = np.array(errors)
+    print("==========>>> Ray fan area error: mean {:.4f}; max {:.4f} <<<==========".format(errors.mean(), errors.max()))
+
+    np.save('result/visible_times.npy', np.array([compute_times['ray'], compute_times['sweep']]))
+    np.save('result/visible_errors.npy', errors)
+
+def analyse_memory():
+    setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
+                   grid_size=0.5,
+                   sensor_buffer=-0.1, max_dist=1, min_dist=0.5, alpha_num=4,
+                   cover_times=1)
+
+    A = setter.A
+    m, n = A.shape
+    # dense int8 A and the dense float matrix handed to the ILP
+    dense_bytes = m * n
+    dense_ilp_bytes = m * n * 8
+    # CSR A and the cvxopt spmatrix handed to the ILP (double values, int64 row indices and column pointers)
+    sparse_bytes = A.data.nbytes + A.indices.nbytes + A.indptr.nbytes
+    sparse_ilp_bytes = A.nnz * (8 + 8) + (m + 1) * 8
+
+    print("==========>>> A: {} x {}; density: {:.4f} <<<==========".format(m, n, A.nnz / (m * n)))
+    print("==========>>> A dense: {:.2f} MB; sparse: {:.2f} MB <<<==========".format(dense_bytes / 2 ** 20,
+                                                                                sparse_bytes / 2 ** 20))
+    print("==========>>> ILP dense: {:.2f} MB; sparse: {:.2f} MB <<<==========".format(dense_ilp_bytes / 2 ** 20,
+                                                                                  sparse_ilp_bytes / 2 ** 20))
+    # packed rows used for coverage evaluation
+    bits_bytes = setter.A_bits.nbytes
+    print("==========>>> A packed bits: {:.2f} MB <<<==========".format(bits_bytes / 2 ** 20))
+
+    np.save('result/memory.npy', np.array([dense_bytes, sparse_bytes, dense_ilp_bytes, sparse_ilp_bytes, bits_bytes]))
 
 def clear_tmp_data():
-    os.remove('data/A.npy')
-    os.remove('data/b.npy')
-    os.remove('data/c.npy')
-    os.remove('data/configs.csv')
+    Cache().clear()
 
 def main():
-    clear_tmp_data()
     setter = model(obj_polygon=OBJ_POLYGON, sensor_types=SENSOR_TYPES,
                    grid_size=0.5,
                    sensor_buffer=-0.1, max_dist=1, min_dist=0.5, alpha_num=4,
@@ -4,34 +4,59 @@
 # email:    xincong.yang@outlook.com
 # name:     Setter_visible
 # ======================================================================================================================
-from shapely.geometry import Point
 import numpy as np
-import os
-from cvxopt import matrix
-from cvxopt.glpk import ilp
+import time
+import heapq
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
+from cvxopt import matrix, spmatrix
+from cvxopt.glpk import ilp, lp
 
 from Setter_sensors import Sensor, Sensors
-from Setter_visible import visible, clip, discrete
+from Setter_cache import Cache, RowCache
+from Setter_presolve import Presolve, split_result
+from Setter_bitset import BitMatrix, demand, add_row, satisfied, popcount, unpack
+from Setter_visible import visible_vectorized, visible_sweep, visible_points, polygon_edges, clip, discrete, \
+    contains_points, location_profile, profile_points, EdgeIndex
 from Setter_plot import plot_visible, plot_background, plot_sensors, plot_points
 
+# visible region generators: 'ray' - fixed step ray fan, 'sweep' - exact angular sweep,
+# 'direct' - cover rows straight from the layout points, regions are only generated for plots by the sweep
+VISIBLE_MODES = {'ray': visible_vectorized, 'sweep': visible_sweep, 'direct': visible_sweep}
+
 class model(object):
     def __init__(self, obj_polygon, sensor_types, grid_size=0.5,
                  sensor_buffer=-0.1, max_dist=1.0, min_dist=0.2, alpha_num=8,
-                 cover_times=1):
+                 cover_times=1, visible_mode='ray', workers=1, chunk_size=64,
+                 cache_dir='data/cache', cache_budget=2 ** 30):
+        assert visible_mode in VISIBLE_MODES, "Please input correct visible mode: {}".format(list(VISIBLE_MODES))
         self.layout = obj_polygon
+        self.layout_edges = polygon_edges(obj_polygon)
+        self.edge_index = EdgeIndex(self.layout_edges)
         self.grid_size = grid_size
         self.cover_times = cover_times
+        self.visible_mode = visible_mode
+        # process pool for the cover matrix, serial if workers <= 1
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+        self.cache = Cache(cache_dir=cache_dir, budget=cache_budget)
+        self.cache_key = self.cache.key(obj_polygon, sensor_types, grid_size=grid_size, sensor_buffer=sensor_buffer,
+                                        max_dist=max_dist, min_dist=min_dist, alpha_num=alpha_num,
+                                        cover_times=cover_times, visible_mode=visible_mode)
+        self.row_cache = RowCache(self.cache, RowCache.scope(obj_polygon, grid_size=grid_size,
+                                                             visible_mode=visible_mode))
 
         sensors = Sensors()
-        # if configs exist, load directly.
-        if os.path.exists('data/configs.csv'):
-            sensors.load_configs()
+        # if configs of the same layout, sensor types and parameters are cached, load directly.
+        if self.cache.exists(self.cache_key):
+            sensors.load_configs(self.cache.path(self.cache_key, 'configs.csv'))
         # or generate all candidate sensors
         else:
             layout_buffer = obj_polygon.buffer(sensor_buffer, 0)
             candidate_locations = clip(layout_buffer, max_dist, min_dist)
             sensors.generate_configs(sensor_types, candidate_locations, alpha_num)
-            sensors.save_configs()
 
         self.sensors = sensors
 
@@ -43,39 +68,95 @@ class model(object):
         self.layout_points_mask = np.zeros(len(self.layout_points), np.bool)
         print("==========>>> Discrete layout into {} points ... <<<==========".format(len(self.layout_points)))
 
-        if os.path.exists('data/A.npy') and os.path.exists('data/b.npy') and os.path.exists('data/c.npy'):
-            print("==========>>> Load cover A, b, c directly ... <<<==========")
-            self.A = np.load('data/A.npy')
-            self.b = np.load('data/b.npy')
-            self.c = np.load('data/c.npy')
+        cache, key = self.cache, self.cache_key
+        if cache.exists(key):
+            print("==========>>> Load cover A, b, c from cache {} ... <<<==========".format(key))
+            self.A = sparse.load_npz(cache.path(key, 'A.npz'))
+            self.b = np.load(cache.path(key, 'b.npy'))
+            self.c = np.load(cache.path(key, 'c.npy'))
+            cache.touch(key)
         else:
             print("==========>>> Compute and save cover A, b, c ... <<<==========")
             A = self._cover_A()
             b = self._cover_b(cover_times=self.cover_times)
             c = self._cover_c()
             print("==========>>> Sensor candidates: %d <<<==========" % self.sensors.get_num)
-            mask = A.sum(axis=1) > 0
-            self.A = A[mask].astype(np.int8)
+            mask = A.getnnz(axis=1) > 0
+            self.A = A[mask]
             self.b = b
             self.c = c[mask]
-            np.save('data/A.npy', self.A)
-            np.save('data/b.npy', self.b)
-            np.save('data/c.npy', self.c)
             self.sensors.update(mask)
-            self.sensors.save_configs()
             print("==========>>> Sensor candidates has been decreased to: %d <<<==========" % self.sensors.get_num)
+            print("==========>>> Row cache: %d hits; %d misses <<<==========" % (self.row_cache.hits,
+                                                                               self.row_cache.misses))
+
+            cache.touch(key)
+            sparse.save_npz(cache.path(key, 'A.npz'), self.A)
+            np.save(cache.path(key, 'b.npy'), self.b)
+            np.save(cache.path(key, 'c.npy'), self.c)
+            # configs go last, they complete the entry
+            self.sensors.save_configs(cache.path(key, 'configs.csv'))
+            cache.evict(keep=key)
+
+        # packed rows for coverage evaluation
+        self.A_bits = BitMatrix(self.A)
 
     def _cover_A(self):
-        cover_A = []
-        for sensor in self.sensors.get_sensors:
-            visibile_region = visible(sensor, self.layout)
-            if visibile_region == None:
-                cover_a = np.zeros(len(self.layout_points))
-            else:
-                cover_a = [visibile_region.contains(Point(point)) for point in self.layout_points]
+        sensors = self.sensors.get_sensors
+        edge_index = self.edge_index
+
+        # only sensors new to the row cache are computed
+        cover_A = [self.row_cache.get(sensor) for sensor in sensors]
+        missing = [i for i, indices in enumerate(cover_A) if indices is None]
+        for i, indices in zip(missing, self._cover_rows([sensors[i] for i in missing])):
+            cover_A[i] = indices
+            self.row_cache.put(sensors[i], indices)
+        if missing:
+            self.row_cache.save()
+
+        print("==========>>> Edge index: build %.3f sec; %d queries %.3f sec; %.1f of %d edges per query <<<==========" %
+              (edge_index.build_time, edge_index.query_num, edge_index.query_time,
+               edge_index.query_edges / max(edge_index.query_num, 1), len(edge_index.edges)))
+        # rows are kept as indices of covered points
+        indptr = np.cumsum([0] + [len(indices) for indices in cover_A])
+        indices = np.concatenate(cover_A + [np.zeros(0, dtype=int)])
+        data = np.ones(len(indices), dtype=np.int8)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(sensors), len(self.layout_points)))
+
+    def _cover_rows(self, sensors):
+        edge_index = self.edge_index
+
+        if self.workers > 1 and len(sensors) > 0:
+            # sensors at the same location go to the same chunk, they share one occlusion profile
+            locations = {}
+            for i, sensor in enumerate(sensors):
+                locations.setdefault((sensor.x, sensor.y), []).append(i)
+            chunks = [[]]
+            for positions in locations.values():
+                if len(chunks[-1]) >= self.chunk_size:
+                    chunks.append([])
+                chunks[-1].extend(positions)
+
+            # layout, points and edge index are shipped once per worker, rows come back in order
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_cover_worker,
+                                     initargs=(self.layout, self.layout_points, edge_index,
+                                               self.visible_mode)) as executor:
+                results = list(executor.map(_cover_chunk, [[sensors[i] for i in chunk] for chunk in chunks]))
+
+            cover_A = [None] * len(sensors)
+            for chunk, (rows, (query_num, query_time, query_edges)) in zip(chunks, results):
+                for i, indices in zip(chunk, rows):
+                    cover_A[i] = indices
+                edge_index.query_num += query_num
+                edge_index.query_time += query_time
+                edge_index.query_edges += query_edges
+            return cover_A
+        else:
+            return cover_rows(sensors, self.layout, self.layout_points, edge_index, self.visible_mode)
 
-            cover_A.append(cover_a)
-        return np.array(cover_A)
+    def _visible(self, sensor):
+        edges = self.edge_index.query_sensor(sensor)
+        return VISIBLE_MODES[self.visible_mode](sensor, self.layout, edges)
 
     def _cover_b(self, cover_times):
         num = len(self.layout_points)
@@ -84,19 +165,48 @@ class model(object):
     def _cover_c(self):
         return self.sensors.get_costs
 
-    def compute(self, mode='min', method='ilp', value=0):
+    def compute(self, mode='min', method='ilp', value=0, seed=None, presolve=None,
+                time_limit=None, warm_start=None, callback=None):
+        options = {'time_limit': time_limit, 'warm_start': warm_start, 'callback': callback}
+        if not (mode == 'min' and method == 'ilp'):
+            assert all(option is None for option in options.values()), \
+                "Please input time_limit, warm_start and callback only for mode='min', method='ilp'"
+            options = {}
         if mode == 'min':
             if method == 'ilp':
-                x = min_solver_ilp(self.A, self.b, self.c)
+                solver = min_solver_ilp
+            elif method == 'greedy':
+                solver = min_solver_greedy
+            elif method == 'lp_round':
+                solver = partial(min_solver_lp_round, seed=seed)
+            elif method == 'lagrange':
+                solver = min_solver_lagrange
 
         elif mode == 'max':
             if method == 'dp':
-                x = max_solver_dp(self.A, self.b, self.c, value)
+                solver = partial(max_solver_dp, C=value)
+            elif method == 'greedy':
+                solver = partial(max_solver_greedy, C=value)
+
+        # by default only the min problem is presolved, dropped sensors change the order of the max solvers
+        if presolve is None:
+            presolve = mode == 'min'
+        if presolve:
+            reduction = Presolve(self.A, self.b, self.c, mode)
+            x, self.lower_bound, self.status = reduction.solve(solver, **options)
+            reduction.report()
+        else:
+            x, self.lower_bound, self.status = split_result(solver(self.A, self.b, self.c, **options))
+
+        if mode == 'min' and self.lower_bound is not None:
+            cost = np.sum(self.c[x])
+            print("==========>>> Status: {}; cost: {:.2f}; lower bound: {:.2f}; gap: {:.2%} <<<==========".format(
+                self.status, cost, self.lower_bound, (cost - self.lower_bound) / max(cost, 1e-12)))
 
         mask = x
         self.sensors.update(mask)
 
-        self.layout_points_mask = np.dot(self.A.T, x) >= 1
+        self.layout_points_mask = unpack(self.A_bits.union(x), len(self.layout_points))
 
     def plot(self, ax, sensor_list=None):
 
@@ -105,9 +215,9 @@ class model(object):
         xs, ys = self.sensors.get_locations
 
         if sensor_list == None:
-            visible_regions = [visible(sensor, self.layout) for sensor in self.sensors.get_sensors]
+            visible_regions = [self._visible(sensor) for sensor in self.sensors.get_sensors]
         else:
-            visible_regions = [visible(self.sensors.get_sensors[i], self.layout) for i in sensor_list]
+            visible_regions = [self._visible(self.sensors.get_sensors[i]) for i in sensor_list]
             xs = [xs[i] for i in sensor_list]
             ys = [ys[i] for i in sensor_list]
 
@@ -126,48 +236,512 @@ class model(object):
     def get_cost(self):
         return self.sensors.get_costs
 
+# cover matrix: ========================================================================================================
+def cover_row(sensor, obj_polygon, layout_points, edge_index, visible_mode):
+    """
+    generate the row of cover matrix A of sensor
+    :param sensor:
+    :param obj_polygon:
+    :param layout_points:
+    :param edge_index:
+    :param visible_mode:
+    :return: bool array - whether each layout point is visible
+    """
+    edges = edge_index.query_sensor(sensor)
+    if visible_mode == 'direct':
+        return visible_points(sensor, layout_points, edges)
+    visibile_region = VISIBLE_MODES[visible_mode](sensor, obj_polygon, edges)
+    return contains_points(visibile_region, layout_points)
+
+def cover_rows(sensors, obj_polygon, layout_points, edge_index, visible_mode):
+    """
+    generate the rows of cover matrix A of sensors, in 'direct' mode the sensors at one location share its occlusion
+    profile, a sensor alone at its location is tested directly
+    :param sensors:
+    :param obj_polygon:
+    :param layout_points:
+    :param edge_index:
+    :param visible_mode:
+    :return: list of indices of covered points
+    """
+    if visible_mode != 'direct':
+        return [np.flatnonzero(cover_row(sensor, obj_polygon, layout_points, edge_index, visible_mode))
+                for sensor in sensors]
+
+    locations = {}
+    for i, sensor in enumerate(sensors):
+        locations.setdefault((sensor.x, sensor.y), []).append(i)
+
+    rows = [None] * len(sensors)
+    for location, positions in locations.items():
+        if len(positions) == 1:
+            sensor = sensors[positions[0]]
+            rows[positions[0]] = np.flatnonzero(cover_row(sensor, obj_polygon, layout_points, edge_index, visible_mode))
+            continue
+        group = [sensors[i] for i in positions]
+        edges = edge_index.query(location, max(sensor.get_FOD[1] for sensor in group))
+        profile = location_profile(location, layout_points, edges, group)
+        for i, sensor in zip(positions, group):
+            rows[i] = profile_points(sensor, profile)
+    return rows
+
+# state of a cover worker process
+_COVER_WORKER = {}
+
+def _init_cover_worker(obj_polygon, layout_points, edge_index, visible_mode):
+    _COVER_WORKER['obj_polygon'] = obj_polygon
+    _COVER_WORKER['layout_points'] = layout_points
+    _COVER_WORKER['edge_index'] = edge_index
+    _COVER_WORKER['visible_mode'] = visible_mode
+
+def _cover_chunk(sensors):
+    edge_index = _COVER_WORKER['edge_index']
+    query_num, query_time, query_edges = edge_index.query_num, edge_index.query_time, edge_index.query_edges
+    rows = cover_rows(sensors, _COVER_WORKER['obj_polygon'], _COVER_WORKER['layout_points'], edge_index,
+                      _COVER_WORKER['visible_mode'])
+    counters = (edge_index.query_num - query_num, edge_index.query_time - query_time,
+                edge_index.query_edges - query_edges)
+    return rows, counters
+
 # max problem: =========================================================================================================
 # Maximize coverage
 # obj. xA - b >= 0
 # s.t. xc <= C
-def max_solver_dp(A, b, c, C):
+def max_solver_dp(A, b, c, C, precision=6):
+    """
+    knapsack dynamic programming over budgets range(C), only the last layer of states is kept with one back-pointer per
+    state, costs are scaled to integers and reduced by their gcd
+    :param A:
+    :param b:
+    :param c:
+    :param C:                   budget
+    :param precision:           decimals of costs kept by scaling
+    :return: selection
+    """
     m = c.shape[0]          # x dimension
-    n = b.shape[0]          # s.t. dimension
-    mat_obj = np.zeros((m, C, n), dtype=np.int)
-    mat_x = np.zeros((m, C, m), dtype=np.bool)
+    # coverage of each state is kept as saturating counters of packed points
+    bits = BitMatrix(A)
+    demands = demand(b)
+    costs, capacity = cost_units(c, C - 1, precision)
+
+    # states of all budgets in the last layer, a budget which the ith can not afford is reset to empty
+    layer = np.zeros((capacity + 1, len(demands) - 1, bits.words.shape[1]), dtype=np.uint64)
+    # back-pointers: 0 - empty, 1 - without ith, 2 - with ith
+    choice = np.zeros((m, capacity + 1), dtype=np.uint8)
+    # live buffers of a step at most: the last and new layer, the forward states, the demand masks of the forward
+    # states in satisfied and its result, which outlive the shifted planes of add_row and the output of np.where
+    step_memory = 2 * layer.nbytes
     for i in range(m):
-        for j in range(C):
-            # when the cost of ith is less than total cost
-            if c[i] <= j:
-                forward_obj = mat_obj[i - 1, int(j - c[i])] + A[i]
-                backward_obj = mat_obj[i - 1, j]
-                forward_sum = (forward_obj - b >= 0).sum()
-                backward_sum = (backward_obj - b >= 0).sum()
-                if forward_sum >= backward_sum:
-                    mat_obj[i, j] = forward_obj
-
-                    mat_x[i, j] = mat_x[i - 1, int(j - c[i])]
-                    mat_x[i, j, i] = True
-                else:
-                    mat_obj[i, j] = backward_obj
-
-                    mat_x[i, j] = mat_x[i - 1, j]
-    return mat_x[-1, -1]
+        cost = costs[i]
+        new_layer = np.zeros_like(layer)
+        if cost <= capacity:
+            forward_obj = add_row(layer[:capacity + 1 - cost], bits.words[i])
+            step_memory = max(step_memory, layer.nbytes + new_layer.nbytes +
+                              forward_obj.nbytes * (2 + 1 / forward_obj.shape[1]))
+            backward_obj = layer[cost:]
+            forward_sum = popcount(satisfied(forward_obj, demands))
+            backward_sum = popcount(satisfied(backward_obj, demands))
+            forward = forward_sum >= backward_sum
+            new_layer[cost:] = np.where(forward[:, None, None], forward_obj, backward_obj)
+            choice[i, cost:] = np.where(forward, 2, 1)
+            # the backward states would keep the last layer alive
+            del forward_obj, backward_obj
+        layer = new_layer
+
+    x = np.zeros(m, dtype=bool)
+    j = capacity
+    for i in range(m - 1, -1, -1):
+        if choice[i, j] == 0:
+            break
+        elif choice[i, j] == 2:
+            x[i] = True
+            j -= costs[i]
+
+    memory = bits.nbytes + choice.nbytes + step_memory
+    print("==========>>> DP peak memory: %.2f MB <<<==========" % (memory / 2 ** 20))
+    return x
+
+def max_solver_greedy(A, b, c, C):
+    """
+    lazy greedy (CELF) by marginal coverage per cost, compared with the best single sensor - (1 - 1/e) / 2 of the
+    optimum for submodular coverage, the gain of a point is capped at its cover times, the selection stops when no
+    sensor adds coverage and redundant sensors are removed
+    :param A:
+    :param b:
+    :param c:
+    :param C:                   budget
+    :return: selection
+    """
+    A = sparse.csr_matrix(A)
+    m = c.shape[0]
+    need = np.ceil(b).astype(int)
+
+    def gain(i, count):
+        points = A.indices[A.indptr[i]:A.indptr[i + 1]]
+        return int(np.sum(count[points] < need[points]))
+
+    count = np.zeros(len(need), dtype=int)
+    single_gains = A.dot((need > 0).astype(int))
+
+    # priority queue of gain per cost, gains are recomputed lazily when they are stale
+    heap = [(- single_gains[i] / max(c[i], 1e-12), i, 0) for i in range(m) if c[i] <= C]
+    heapq.heapify(heap)
+
+    x = np.zeros(m, dtype=bool)
+    total_cost, total_gain, step = 0., 0, 0
+    while heap:
+        _, i, computed = heapq.heappop(heap)
+        if total_cost + c[i] > C:
+            continue
+        if computed < step:
+            heapq.heappush(heap, (- gain(i, count) / max(c[i], 1e-12), i, step))
+            continue
+        # gains only decrease, no sensor left adds coverage
+        fresh_gain = gain(i, count)
+        if fresh_gain == 0:
+            break
+        points = A.indices[A.indptr[i]:A.indptr[i + 1]]
+        total_gain += fresh_gain
+        count[points] += 1
+        total_cost += c[i]
+        x[i] = True
+        step += 1
+    # sensors picked early can be covered over by later ones
+    prune_cover(A, c, need, x)
+
+    # best single sensor within budget
+    affordable = np.flatnonzero(c <= C)
+    if len(affordable) > 0:
+        best = affordable[np.argmax(single_gains[affordable])]
+        if single_gains[best] > total_gain:
+            x = np.zeros(m, dtype=bool)
+            x[best] = True
+    return x
+
+def cost_units(c, budget, precision=6):
+    """
+    scale costs and budget to integer units and divide them by the gcd of costs
+    :param c:
+    :param budget:
+    :param precision:           decimals of costs kept by scaling
+    :return: integer costs and budget
+    """
+    scale = 1
+    while scale < 10 ** precision and not np.allclose(c * scale, np.round(c * scale)):
+        scale *= 10
+    costs = np.round(c * scale).astype(int)
+    unit = np.gcd.reduce(costs[costs > 0]) if np.any(costs > 0) else 1
+    return costs // unit, int(np.floor(budget * scale / unit + 1e-9))
 
 # min problem: =========================================================================================================
 # Minimize cost
 # obj. xc
 # s.t. Ax >= b
-def min_solver_ilp(A, b, c):
+def min_solver_ilp(A, b, c, time_limit=None, warm_start=None, callback=None):
+    """
+    solve the ilp by glpk, anytime when a time limit or a warm start is given: the first incumbent is the warm start
+    or a greedy cover, then glpk is re-solved with a cutoff below the cost of the incumbent until it is proved optimal
+    or the time is up
+    :param A:
+    :param b:
+    :param c:
+    :param time_limit:          seconds, None waits for the optimum
+    :param warm_start:          selection to start from, repaired greedily if it is not a cover
+    :param callback:            function of selection, cost and lower bound, called with every incumbent, or once
+                                with the optimum without a time limit and a warm start
+    :return: selection, lower bound of the optimal cost, status - 'optimal' or 'feasible'
+    """
     # ilp form:
     # obj. min c'x
     # s.t. Gx <= h
-    G = matrix((-1) * A.T.astype(np.float))
-    h = matrix((-1) * b.astype(np.float))
-    c = matrix(c.astype(np.float))
+    A = sparse.csr_matrix(A)
+    need = cover_need(A, b)
+    G = cvx_sparse(-A.T)
+    h = matrix((-1) * need.astype(float))
     x_num = len(c)
-    (status, x) = ilp(c, G, h, B=set(range(x_num)))
-    return np.array(x)
+
+    if time_limit is None and warm_start is None:
+        (status, x) = ilp(matrix(c.astype(float)), G, h, B=set(range(x_num)))
+        if status not in ('optimal', 'feasible'):
+            raise RuntimeError("ILP is not solved: {}".format(status))
+        x = np.ravel(x) > 0.5
+        lower_bound = np.sum(c[x]) if status == 'optimal' else None
+        if callback is not None:
+            callback(x, np.sum(c[x]), lower_bound)
+        return x, lower_bound, status
+
+    start = time.time()
+    _, lower_bound = lp_relaxation(A, need, c)
+    units, _ = cost_units(c, 0)
+    step = np.max(c) / max(np.max(units), 1)
+
+    # the warm start repaired greedily, or a greedy cover
+    incumbent = np.zeros(x_num, dtype=bool) if warm_start is None else np.ravel(warm_start) > 0.5
+    residual = np.maximum(need - A.T.dot(incumbent.astype(int)), 0)
+    incumbent = prune_cover(A, c, need, greedy_cover(A, c, residual, incumbent.copy()))
+    if callback is not None:
+        callback(incumbent, np.sum(c[incumbent]), lower_bound)
+
+    # every round gets a slice of the time, doubled round by round
+    status, time_slice = 'feasible', 1.
+    while True:
+        remaining = np.inf if time_limit is None else time_limit - (time.time() - start)
+        if remaining <= 0:
+            break
+        options = {'msg_lev': 'GLP_MSG_OFF', 'tm_lim': int(1000 * min(remaining, time_slice))}
+
+        # cutoff: c'x <= cost of incumbent - step
+        G_k = cvx_sparse(sparse.vstack([-A.T, c[None, :]]))
+        h_k = matrix(np.append(-need, np.sum(c[incumbent]) - step / 2).astype(float))
+        (round_status, x) = ilp(matrix(c.astype(float)), G_k, h_k, B=set(range(x_num)), options=options)
+
+        if round_status in ('optimal', 'feasible'):
+            incumbent = np.ravel(x) > 0.5
+            if callback is not None:
+                callback(incumbent, np.sum(c[incumbent]), lower_bound)
+            if round_status == 'optimal':
+                status = 'optimal'
+                break
+        elif round_status == 'undefined':
+            # time is up before a better incumbent is found
+            if remaining <= time_slice:
+                break
+        elif 'infeasible' in round_status:
+            # no cover is cheaper than the incumbent
+            status = 'optimal'
+            break
+        else:
+            raise RuntimeError("ILP is not solved: {}".format(round_status))
+        time_slice *= 2
+
+    return incumbent, np.sum(c[incumbent]) if status == 'optimal' else lower_bound, status
+
+def cvx_sparse(M):
+    """
+    :param M:                   scipy sparse matrix
+    :return: cvxopt sparse matrix
+    """
+    M = sparse.coo_matrix(M)
+    return spmatrix(M.data.astype(float), M.row.tolist(), M.col.tolist(), size=M.shape)
+
+def lp_relaxation(A, need, c):
+    """
+    :param A:                   csr cover matrix
+    :param need:
+    :param c:
+    :return: lp optimum, lower bound of the optimal cost
+    """
+    m = A.shape[0]
+    # lp form:
+    # obj. min c'x
+    # s.t. -A'x <= -b, -x <= 0, x <= 1
+    G = cvx_sparse(sparse.vstack([-A.T, -sparse.identity(m), sparse.identity(m)]))
+    h = matrix(np.concatenate([-need, np.zeros(m), np.ones(m)]).astype(float))
+    status, x_lp, _ = lp(matrix(c.astype(float)), G, h)
+    if status != 'optimal':
+        raise RuntimeError("LP relaxation is not solved: {}".format(status))
+    x_lp = np.clip(np.ravel(x_lp), 0, 1)
+    return x_lp, float(np.dot(c, x_lp))
+
+def min_solver_greedy(A, b, c):
+    """
+    greedy by uncovered points per cost, then redundant sensors are pruned
+    lower bound: greedy cost / H(max row size), and the cheapest covers demanded by every single point
+    :param A:
+    :param b:
+    :param c:
+    :return: selection, lower bound of the optimal cost
+    """
+    A = sparse.csr_matrix(A)
+    need = cover_need(A, b)
+    x = greedy_cover(A, c, need.copy(), np.zeros(A.shape[0], dtype=bool))
+    greedy_cost = np.sum(c[x])
+    x = prune_cover(A, c, need, x)
+
+    row_size = np.max(np.diff(A.indptr), initial=1)
+    harmonic = np.sum(1. / np.arange(1, row_size + 1))
+    return x, max(greedy_cost / harmonic, point_bound(A, c, need))
+
+def min_solver_lp_round(A, b, c, trials=10, seed=None):
+    """
+    solve the lp relaxation, round it by thresholds and randomly, complete the covers greedily and prune them
+    lower bound: the lp optimum
+    :param A:
+    :param b:
+    :param c:
+    :param trials:              number of random roundings
+    :param seed:                random seed
+    :return: selection, lower bound of the optimal cost
+    """
+    A = sparse.csr_matrix(A)
+    need = cover_need(A, b)
+    m = A.shape[0]
+    x_lp, lower_bound = lp_relaxation(A, need, c)
+
+    # thresholds: a point is covered by at most f sensors, so 1 / f keeps the lp cover, higher ones are cheaper
+    frequency = np.max(np.diff(A.T.tocsr().indptr), initial=1)
+    thresholds = [1. / frequency - 1e-9] + [0.1 * k for k in range(1, 10)]
+    rounds = [x_lp >= threshold for threshold in thresholds]
+    rng = np.random.default_rng(seed)
+    rounds += [rng.random(m) < x_lp for _ in range(trials)]
+
+    best_x, best_cost = None, np.inf
+    for x in rounds:
+        residual = np.maximum(need - A.T.dot(x.astype(int)), 0)
+        x = greedy_cover(A, c, residual, x.copy())
+        x = prune_cover(A, c, need, x)
+        cost = np.sum(c[x])
+        if cost < best_cost:
+            best_x, best_cost = x, cost
+    return best_x, lower_bound
+
+def min_solver_lagrange(A, b, c, iterations=1000, step=2., patience=50, heuristic_every=10, tolerance=1e-3):
+    """
+    lagrangian relaxation of the cover constraints by multipliers u >= 0 of points, maximized by subgradient steps
+    L(u) = u'b + sum(min(0, c - Au)) is a lower bound, the sensors of negative reduced costs c - Au are completed
+    greedily and pruned into covers
+    :param A:
+    :param b:
+    :param c:
+    :param iterations:          maximum number of subgradient steps
+    :param step:                initial step factor, halved when the bound does not improve for patience steps
+    :param patience:
+    :param heuristic_every:     steps between two heuristic covers
+    :param tolerance:           relative gap to stop at
+    :return: selection, lower bound of the optimal cost
+    """
+    A = sparse.csr_matrix(A).astype(float)
+    At = A.T.tocsr()
+    need = cover_need(A, b)
+    active = need > 0
+
+    best_x = greedy_cover(A, c, need.copy(), np.zeros(A.shape[0], dtype=bool))
+    best_x = prune_cover(A, c, need, best_x)
+    upper_bound = np.sum(c[best_x])
+
+    # start from the cheapest cost per point of sensors
+    sizes = np.maximum(np.diff(A.indptr), 1)
+    u = np.zeros(A.shape[1])
+    u[active] = sparse_min(At, c / sizes)[active]
+    lower_bound, stall = 0., 0
+    for k in range(iterations):
+        reduced = c - A.dot(u)
+        x = reduced < 0
+        bound = np.dot(u, need) + np.sum(reduced[x])
+        if bound > lower_bound + 1e-9:
+            lower_bound, stall = bound, 0
+        else:
+            stall += 1
+            if stall >= patience:
+                step, stall = step / 2, 0
+
+        if k % heuristic_every == 0:
+            residual = np.maximum(need - At.dot(x), 0)
+            cover = prune_cover(A, c, need, greedy_cover(A, c, residual, x.copy()))
+            if np.sum(c[cover]) < upper_bound:
+                best_x, upper_bound = cover, np.sum(c[cover])
+
+        if upper_bound - lower_bound <= tolerance * upper_bound or step < 1e-4:
+            break
+
+        subgradient = need - At.dot(x)
+        subgradient[(u <= 0) & (subgradient < 0)] = 0
+        norm = np.dot(subgradient, subgradient)
+        if norm == 0:
+            break
+        u = np.maximum(u + step * (upper_bound - bound) / norm * subgradient, 0)
+
+    print("==========>>> Lagrangian: {} steps; lower bound: {:.2f}; upper bound: {:.2f} <<<==========".format(
+        k + 1, lower_bound, upper_bound))
+    return best_x, lower_bound
+
+def sparse_min(M, values):
+    """
+    minimum of values over the nonzeros of each row
+    :param M:                   csr matrix
+    :param values:              one value per column
+    :return: minimums, inf for empty rows
+    """
+    minimums = np.full(M.shape[0], np.inf)
+    nonempty = np.diff(M.indptr) > 0
+    minimums[nonempty] = np.minimum.reduceat(values[M.indices], M.indptr[:-1][nonempty])
+    return minimums
+
+def cover_need(A, b):
+    """
+    cover times of points, capped at the number of sensors that can cover them
+    :param A:                   csr cover matrix
+    :param b:
+    :return: int array
+    """
+    need = np.ceil(b).astype(int)
+    available = np.diff(A.T.tocsr().indptr)
+    if np.any(need > available):
+        print("==========>>> {} points can not be covered as demanded <<<==========".format(np.sum(need > available)))
+    return np.minimum(need, available)
+
+def greedy_cover(A, c, residual, x):
+    """
+    add the sensor with most uncovered points per cost until no point is uncovered, gains are updated incrementally
+    :param A:                   csr cover matrix
+    :param c:
+    :param residual:            cover times still demanded by points, updated in place
+    :param x:                   selection to start from, updated in place
+    :return: selection
+    """
+    At = A.T.tocsr()
+    gains = A.dot((residual > 0).astype(int))
+    gains[x] = 0
+    while np.any(gains > 0):
+        i = np.argmax(np.where(gains > 0, gains / np.maximum(c, 1e-12), -1))
+        x[i] = True
+        gains[i] = 0
+
+        points = A.indices[A.indptr[i]:A.indptr[i + 1]]
+        points = points[residual[points] > 0]
+        residual[points] -= 1
+
+        # sensors lose the points which are covered enough
+        done = points[residual[points] == 0]
+        if len(done) > 0:
+            gains -= np.bincount(At[done].indices, minlength=len(gains))
+            gains[x] = 0
+    return x
+
+def prune_cover(A, c, need, x):
+    """
+    remove redundant sensors from the most expensive
+    :param A:                   csr cover matrix
+    :param c:
+    :param need:
+    :param x:                   selection, updated in place
+    :return: selection
+    """
+    count = A.T.dot(x.astype(int))
+    selected = np.flatnonzero(x)
+    for i in selected[np.argsort(-c[selected], kind='stable')]:
+        points = A.indices[A.indptr[i]:A.indptr[i + 1]]
+        if np.all(count[points] > need[points]):
+            x[i] = False
+            count[points] -= 1
+    return x
+
+def point_bound(A, c, need):
+    """
+    the largest sum of the cheapest covers demanded by a single point
+    :param A:                   csr cover matrix
+    :param c:
+    :param need:
+    :return:
+    """
+    At = A.T.tocsr()
+    points = np.repeat(np.arange(At.shape[0]), np.diff(At.indptr))
+    costs = c[At.indices]
+    order = np.lexsort((costs, points))
+    rank = np.arange(len(order)) - At.indptr[points[order]]
+    cheapest = rank < need[points[order]]
+    return np.max(np.bincount(points[order][cheapest], weights=costs[order][cheapest], minlength=At.shape[0]),
+                  initial=0)
 
 # Multi-object problem: ================================================================================================
 # obj. max xA - b >= 0
@@ -0,0 +1,184 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     Setter_presolve
+# ======================================================================================================================
+import time
+import numpy as np
+from functools import partial
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+class Presolve(object):
+    # reduce the cover problem A, b, c before solving, then map solutions back to the original sensors
+    # min: forced sensors, dominated points, dominated sensors and independent components
+    # max: dominated sensors only, every point counts in the objective
+    def __init__(self, A, b, c, mode='min'):
+        start = time.time()
+        # binary int32 copy, the overlap products of an int8 A would wrap above 127
+        self.A = (sparse.csr_matrix(A) != 0).astype(np.int32)
+        self.b = np.asarray(b)
+        self.c = np.asarray(c)
+        self.mode = mode
+        m, n = self.A.shape
+
+        need = np.ceil(self.b).astype(int)
+        if mode == 'min':
+            need = np.minimum(need, self.A.getnnz(axis=0))
+        self.need = need
+        self.fixed = np.zeros(m, dtype=bool)
+        self.sensors = np.arange(m)
+        self.points = np.flatnonzero(need > 0) if mode == 'min' else np.arange(n)
+
+        changed = True
+        while changed:
+            changed = False
+            if mode == 'min':
+                changed |= self._fix_forced()
+                changed |= self._drop_points()
+            changed |= self._drop_sensors()
+
+        if mode == 'min' and len(self.sensors) > 0:
+            self.components = self._split()
+        else:
+            self.components = [(self.sensors, self.points)]
+
+        self.presolve_time = time.time() - start
+        self.solve_time = 0.
+
+    def _reduced(self):
+        return self.A[self.sensors][:, self.points]
+
+    def _fix_forced(self):
+        # a point covered by exactly as many sensors as it needs forces all of them
+        B = self._reduced()
+        sizes = B.getnnz(axis=0)
+        tight = (sizes == self.need[self.points]) & (sizes > 0)
+        if not np.any(tight):
+            return False
+
+        forced = np.unique(B.T.tocsr()[np.flatnonzero(tight)].indices)
+        self.fixed[self.sensors[forced]] = True
+        covered = np.ravel(B[forced].sum(axis=0))
+        self.need[self.points] = np.maximum(self.need[self.points] - covered, 0)
+
+        self.sensors = np.delete(self.sensors, forced)
+        self.points = self.points[self.need[self.points] > 0]
+        return True
+
+    def _drop_points(self):
+        # point j is implied by point l if every sensor covering l covers j and l needs at least as many covers
+        Bt = self._reduced().T.tocsr()
+        sizes = Bt.getnnz(axis=1)
+        need = self.need[self.points]
+        overlap = (Bt @ Bt.T).tocoo()
+        j, l = overlap.row, overlap.col
+        subset = (overlap.data == sizes[l]) & (j != l)
+        stronger = (need[l] > need[j]) | ((need[l] == need[j]) & ((sizes[l] < sizes[j]) | ((sizes[l] == sizes[j]) & (l < j))))
+        dropped = np.unique(j[subset & stronger])
+        if len(dropped) == 0:
+            return False
+        self.points = np.delete(self.points, dropped)
+        return True
+
+    def _drop_sensors(self):
+        # sensor i is dominated by sensor k if k covers every point of i at no more cost,
+        # unless i is needed for a second cover of its points
+        B = self._reduced()
+        sizes = B.getnnz(axis=1)
+        costs = self.c[self.sensors]
+        single = np.ones(len(sizes), dtype=bool)
+        if len(self.points) > 0:
+            multiple = (self.need[self.points] > 1).astype(int)
+            single = B.dot(multiple) == 0
+
+        overlap = (B @ B.T).tocoo()
+        i, k = overlap.row, overlap.col
+        subset = (overlap.data == sizes[i]) & (i != k) & single[i]
+        cheaper = (costs[k] < costs[i]) | ((costs[k] == costs[i]) & ((sizes[k] > sizes[i]) | ((sizes[k] == sizes[i]) & (k < i))))
+        dropped = np.union1d(i[subset & cheaper], np.flatnonzero(sizes == 0))
+        if len(dropped) == 0:
+            return False
+        self.sensors = np.delete(self.sensors, dropped)
+        return True
+
+    def _split(self):
+        # connected components of the bipartite graph of sensors and points
+        B = self._reduced()
+        m, n = B.shape
+        graph = sparse.bmat([[None, B], [B.T, None]], format='csr')
+        num, labels = connected_components(graph, directed=False)
+        return [(self.sensors[labels[:m] == k], self.points[labels[m:] == k]) for k in range(num)]
+
+    def solve(self, solver, warm_start=None, time_limit=None, callback=None):
+        """
+        solve every component and map the solutions back to the original sensors
+        :param solver:          function of A, b, c returning a selection, or a selection, a lower bound and a status
+        :param warm_start:      selection of all sensors, passed to the solver by components
+        :param time_limit:      seconds for all components, the remaining time is shared by the components left
+                                (warm_start, time_limit and callback are only given to solvers which accept them)
+        :param callback:        function of selection, cost and lower bound of all sensors, called with every
+                                incumbent of a component, the components not solved yet keep their greedy covers
+        :return: selection of all sensors, lower bound of the optimal cost (None if the solver gives none), status
+        """
+        start = time.time()
+        components = [(sensors, points) for sensors, points in self.components if len(sensors) > 0]
+        x = self.fixed.copy()
+        lower_bound = np.sum(self.c[self.fixed])
+        status = 'optimal'
+        if callback is not None:
+            incumbents = self._incumbents(components)
+        for k, (sensors, points) in enumerate(components):
+            b = self.need[points] if self.mode == 'min' else self.b[points]
+            kwargs = {} if warm_start is None else {'warm_start': np.ravel(warm_start)[sensors]}
+            if time_limit is not None:
+                kwargs['time_limit'] = max(time_limit - (time.time() - start), 0) / (len(components) - k)
+            if callback is not None:
+                kwargs['callback'] = partial(self._report, components, incumbents, k, callback)
+            x_k, bound_k, status_k = split_result(solver(self.A[sensors][:, points], b, self.c[sensors], **kwargs))
+            x[sensors] = x_k
+            lower_bound = None if lower_bound is None or bound_k is None else lower_bound + bound_k
+            status = status if status_k == 'optimal' else status_k
+        self.solve_time = time.time() - start
+        return x, lower_bound, status
+
+    def _incumbents(self, components):
+        # greedy covers and lower bounds of all components, as a list of [selection, lower bound]
+        # imported here as Setter_model imports this module
+        from Setter_model import min_solver_greedy
+        incumbents = []
+        for sensors, points in components:
+            x_k, bound_k = min_solver_greedy(self.A[sensors][:, points], self.need[points], self.c[sensors])
+            incumbents.append([x_k, bound_k])
+        return incumbents
+
+    def _report(self, components, incumbents, k, callback, x_k, cost_k, bound_k):
+        # pass the incumbent of component k to callback as a selection of all sensors
+        incumbents[k] = [np.ravel(x_k) > 0.5, incumbents[k][1] if bound_k is None else max(bound_k, incumbents[k][1])]
+        x = self.fixed.copy()
+        lower_bound = np.sum(self.c[self.fixed])
+        for (sensors, _), (x_l, bound_l) in zip(components, incumbents):
+            x[sensors] = x_l
+            lower_bound += bound_l
+        callback(x, np.sum(self.c[x]), lower_bound)
+
+    def report(self):
+        B = self._reduced()
+        m, n = self.A.shape
+        print("==========>>> Presolve: sensors {} -> {} ({:.1%}); points {} -> {} ({:.1%}); nonzeros {} -> {} ({:.1%}) <<<==========".format(
+            m, len(self.sensors), len(self.sensors) / max(m, 1),
+            n, len(self.points), len(self.points) / max(n, 1),
+            self.A.nnz, B.nnz, B.nnz / max(self.A.nnz, 1)))
+        print("==========>>> Presolve: {} fixed sensors; {} components; presolve {:.3f} sec; solve {:.3f} sec <<<==========".format(
+            np.sum(self.fixed), len(self.components), self.presolve_time, self.solve_time))
+
+def split_result(result):
+    """
+    :param result:              selection, or selection and lower bound, or selection, lower bound and status
+    :return: bool selection, lower bound or None, status - 'optimal' or 'feasible'
+    """
+    if not isinstance(result, tuple):
+        result = (result, )
+    x, lower_bound, status = result + (None, 'feasible')[len(result) - 1:]
+    return np.ravel(x) > 0.5, lower_bound, status
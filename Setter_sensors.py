@@ -24,7 +24,8 @@ class Sensor(object):
         self.min_rho = float(sensor_type['min_rho'])
         self.max_rho = float(sensor_type['max_rho'])
         self.theta = float(sensor_type['theta'])
-        self.isOmini = int(sensor_type['isOmini'])
+        # 'isOmni' is accepted as well
+        self.isOmini = int(sensor_type['isOmini'] if 'isOmini' in sensor_type else sensor_type['isOmni'])
         self.isThrough = int(sensor_type['isThrough'])
         self.cost = float(sensor_type['cost'])
 
@@ -82,7 +83,7 @@ class Sensors(object):
         for location in locations:
             for type in types:
                 # if sensor is Omini
-                if int(type['isOmini']):
+                if Sensor(type).isOmini:
                     sensor = Sensor(type)
                     sensor.place(location[0], location[1])
                     sensors.append(sensor)
@@ -5,7 +5,13 @@
 # name:     Setter_visible
 # ======================================================================================================================
 import numpy as np
+import time
 from shapely.geometry import Polygon, Point
+try:
+    # vectorized predicates of shapely >= 2.0
+    from shapely import contains_xy
+except ImportError:
+    contains_xy = None
 
 # precision of visibility region
 EPSILON = 0.01
@@ -79,6 +85,301 @@ def visible(sensor, obj_polygon):
 
         angle += EPSILON
 
+    return _region(ray_ends, x0, y0, min_rho)
+
+def visible_vectorized(sensor, obj_polygon, edges=None):
+    """
+    generate sensor visible region in obj_polygon, all rays are cast against all edges at once
+    :param sensor:
+    :param obj_polygon:
+    :param edges:               edges of obj_polygon in shape (n, 2, 2), collected if None
+    :return: visible region
+    """
+    config = sensor.get_config
+
+    x0, y0 = config['x'], config['y']
+
+    ray_start = [x0, y0]
+
+    min_angle, max_angle = sensor.get_FOV
+    min_rho, max_rho = sensor.get_FOD
+
+    angles = fan_angles(min_angle, max_angle)
+    ray_ends = np.stack([x0 + max_rho * np.cos(angles), y0 + max_rho * np.sin(angles)], axis=1)
+
+    if not config['isThrough']:
+        if edges is None:
+            edges = polygon_edges(obj_polygon)
+        ray_ends = ray_casting_batch(ray_start, ray_ends, edges, max_rho)
+
+    ray_ends = ray_ends.tolist()
+    if not (config['isOmini'] or min_rho > 0):
+        ray_ends.insert(0, ray_start)
+
+    return _region(ray_ends, x0, y0, min_rho)
+
+def visible_sweep(sensor, obj_polygon, edges=None):
+    """
+    generate the exact sensor visible region in obj_polygon by an angular sweep over the edge vertices
+    :param sensor:
+    :param obj_polygon:
+    :param edges:               edges of obj_polygon in shape (n, 2, 2), collected if None
+    :return: visible region
+    """
+    config = sensor.get_config
+
+    x0, y0 = config['x'], config['y']
+
+    min_angle, max_angle = sensor.get_FOV
+    min_rho, max_rho = sensor.get_FOD
+
+    visible_region = sector([x0, y0], min_angle, max_angle, max_rho, config['isOmini'])
+
+    if not config['isThrough']:
+        if edges is None:
+            edges = polygon_edges(obj_polygon)
+        # the box closes the sweep when edges is only the part of the layout near the sensor
+        edges = enclose(edges, [x0, y0], max_rho)
+        visible_region = visible_region.intersection(Polygon(angular_sweep([x0, y0], edges)))
+
+    if min_rho > 0:
+        visible_region = visible_region.difference(Point((x0, y0)).buffer(distance=min_rho))
+
+    if visible_region.is_empty:
+        return None
+    return visible_region
+
+def sector(center, min_angle, max_angle, rho, isOmini):
+    """
+    generate the FOV sector of radius rho, the arc is sampled every EPSILON like the ray fan
+    :param center:              [x0, y0]
+    :param min_angle:
+    :param max_angle:
+    :param rho:
+    :param isOmini:
+    :return:
+    """
+    x0, y0 = center
+    angles = np.append(fan_angles(min_angle, max_angle), max_angle)
+    arc = np.stack([x0 + rho * np.cos(angles), y0 + rho * np.sin(angles)], axis=1).tolist()
+    if isOmini:
+        return Polygon(arc)
+    else:
+        return Polygon([center] + arc)
+
+def enclose(edges, center, rho):
+    """
+    add a box around edges and the disc of radius rho at center
+    :param edges:               edges in shape (n, 2, 2)
+    :param center:              [x0, y0]
+    :param rho:
+    :return: edges in shape (n + 4, 2, 2)
+    """
+    x0, y0 = center
+    points = np.concatenate([edges.reshape(-1, 2), [[x0 - rho, y0 - rho], [x0 + rho, y0 + rho]]])
+    min_x, min_y = points.min(axis=0) - 1
+    max_x, max_y = points.max(axis=0) + 1
+    box = np.array([[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y], [min_x, min_y]])
+    return np.concatenate([edges, np.stack([box[:-1], box[1:]], axis=1)], axis=0)
+
+def angular_sweep(center, edges):
+    """
+    generate the visibility polygon of center among non-crossing edges - sweep a ray counter clock wise from -pi,
+    keep the active edges ordered by distance and emit a vertex whenever the nearest edge changes
+    :param center:              [x0, y0]
+    :param edges:               edges in shape (n, 2, 2)
+    :return: vertices of visibility polygon in counter clock wise
+    """
+    x0, y0 = center
+    rel = edges - np.array([x0, y0])
+
+    # orient every edge counter clock wise as seen from center, drop edges pointing at center
+    cross = rel[:, 0, 0] * rel[:, 1, 1] - rel[:, 0, 1] * rel[:, 1, 0]
+    rel = rel[cross != 0]
+    swap = cross[cross != 0] < 0
+    rel[swap] = rel[swap, ::-1]
+
+    phi = np.arctan2(rel[:, :, 1], rel[:, :, 0])
+    starts, ends = phi[:, 0].tolist(), phi[:, 1].tolist()
+    rel = rel.tolist()
+
+    def ray_distance(i, angle):
+        (x1, y1), (x2, y2) = rel[i]
+        dx, dy = x2 - x1, y2 - y1
+        return (x1 * dy - y1 * dx) / (np.cos(angle) * dy - np.sin(angle) * dx)
+
+    def closer(i, j, angle):
+        # non-crossing edges keep their order over their common angular span, compare at its middle
+        span = min((ends[i] - angle) % (2 * np.pi), (ends[j] - angle) % (2 * np.pi))
+        middle = angle + span / 2
+        return ray_distance(i, middle) < ray_distance(j, middle)
+
+    def insert(active, i, angle):
+        low, high = 0, len(active)
+        while low < high:
+            mid = (low + high) // 2
+            if closer(active[mid], i, angle):
+                low = mid + 1
+            else:
+                high = mid
+        active.insert(low, i)
+
+    def hit(i, angle):
+        if angle == starts[i]:
+            x, y = rel[i][0]
+        elif angle == ends[i]:
+            x, y = rel[i][1]
+        else:
+            t = ray_distance(i, angle)
+            x, y = t * np.cos(angle), t * np.sin(angle)
+        return (x0 + x, y0 + y)
+
+    # edges across the branch cut are active at the start of the sweep
+    active = []
+    for i in range(len(rel)):
+        if ends[i] < starts[i]:
+            insert(active, i, -np.pi)
+
+    # removals go before insertions at the same angle, edges across the branch cut come back at their start
+    events = sorted([(ends[i], 0, i) for i in range(len(rel))] + [(starts[i], 1, i) for i in range(len(rel))])
+
+    vertices = []
+    k = 0
+    while k < len(events):
+        angle = events[k][0]
+        nearest = active[0] if active else None
+        while k < len(events) and events[k][0] == angle:
+            _, kind, i = events[k]
+            if kind == 0:
+                active.remove(i)
+            else:
+                insert(active, i, angle)
+            k += 1
+
+        if active and active[0] != nearest:
+            for i in (nearest, active[0]):
+                if i is not None:
+                    vertex = hit(i, angle)
+                    if not vertices or vertices[-1] != vertex:
+                        vertices.append(vertex)
+
+    return vertices
+
+def visible_points(sensor, points, edges, block_size=4096):
+    """
+    determine whether each point is visible to sensor without building the visible region - points within FOD and
+    FOV are tested for walls between them and the sensor
+    :param sensor:
+    :param points:              points in shape (n, 2)
+    :param edges:               edges which may block the sensor in shape (k, 2, 2)
+    :param block_size:          number of points tested against edges at once
+    :return: bool array
+    """
+    config = sensor.get_config
+
+    x0, y0 = config['x'], config['y']
+
+    min_angle, max_angle = sensor.get_FOV
+    min_rho, max_rho = sensor.get_FOD
+
+    dx, dy = points[:, 0] - x0, points[:, 1] - y0
+    rho = np.sqrt(dx ** 2 + dy ** 2)
+    visible = (rho >= min_rho) & (rho <= max_rho)
+
+    if not config['isOmini']:
+        phi = np.arctan2(dy, dx)
+        visible &= (phi - min_angle) % (2 * np.pi) <= max_angle - min_angle
+
+    if not config['isThrough'] and len(edges) > 0:
+        candidates = np.flatnonzero(visible)
+        for i in range(0, len(candidates), block_size):
+            block = candidates[i:i + block_size]
+            visible[block] = ~isIntersect_batch([x0, y0], points[block], edges).any(axis=1)
+
+    return visible
+
+def location_profile(center, points, edges, sensors):
+    """
+    generate the occlusion profile of a location, shared by all sensors placed there - the exact visibility polygon
+    of the location is swept once and only points seen by at least one sensor which can not pass through objects are
+    tested against it
+    :param center:              [x0, y0]
+    :param points:              points in shape (n, 2)
+    :param edges:               edges which may block a ray from center within the largest FOD in shape (k, 2, 2)
+    :param sensors:             sensors at center
+    :return: indices of points within the largest FOD, their rho, phi and whether they are unoccluded, sorted by rho
+    """
+    x0, y0 = center
+    max_rho = max(sensor.get_FOD[1] for sensor in sensors)
+    dx, dy = points[:, 0] - x0, points[:, 1] - y0
+    rho = np.sqrt(dx ** 2 + dy ** 2)
+    near = np.flatnonzero(rho <= max_rho)
+    near = near[np.argsort(rho[near], kind='stable')]
+    rho = rho[near]
+    phi = np.arctan2(dy[near], dx[near])
+
+    seen = np.zeros(len(near), dtype=bool)
+    for sensor in sensors:
+        if not sensor.get_config['isThrough']:
+            ring, mask = ring_mask(sensor, rho, phi)
+            seen[ring] |= mask
+
+    unoccluded = np.ones(len(near), dtype=bool)
+    if seen.any():
+        candidates = np.flatnonzero(seen)
+        visibility_polygon = Polygon(angular_sweep(center, enclose(edges, center, max_rho)))
+        unoccluded[candidates] = contains_points(visibility_polygon, points[near[candidates]])
+
+    return near, rho, phi, unoccluded
+
+def profile_points(sensor, profile):
+    """
+    mask the location profile by FOD and FOV of sensor
+    :param sensor:
+    :param profile:             location_profile of the sensor location
+    :return: indices of visible points
+    """
+    near, rho, phi, unoccluded = profile
+
+    ring, visible = ring_mask(sensor, rho, phi)
+    if not sensor.get_config['isThrough']:
+        visible &= unoccluded[ring]
+
+    return np.sort(near[ring][visible])
+
+def ring_mask(sensor, rho, phi):
+    """
+    determine which points at distance rho and bearing phi are within FOD and FOV of sensor
+    :param sensor:
+    :param rho:                 ascending
+    :param phi:
+    :return: slice of points within FOD and bool array of points within FOV on the slice
+    """
+    min_angle, max_angle = sensor.get_FOV
+    min_rho, max_rho = sensor.get_FOD
+
+    ring = slice(np.searchsorted(rho, min_rho, side='left'), np.searchsorted(rho, max_rho, side='right'))
+    if sensor.get_config['isOmini']:
+        mask = np.ones(ring.stop - ring.start, dtype=bool)
+    else:
+        # phi in [-pi, pi], compare with the FOV moved to start in [-pi, pi) instead of a modulo per point
+        low = (min_angle + np.pi) % (2 * np.pi) - np.pi
+        high = low + max_angle - min_angle
+        if high <= np.pi:
+            mask = (phi[ring] >= low) & (phi[ring] <= high)
+        else:
+            mask = (phi[ring] >= low) | (phi[ring] <= high - 2 * np.pi)
+    return ring, mask
+
+def _region(ray_ends, x0, y0, min_rho):
+    """
+    close the ray ends into a polygon and remove the blind disc of the sensor
+    :param ray_ends:
+    :param x0:
+    :param y0:
+    :param min_rho:
+    :return: visible region
+    """
     visible_region = Polygon(ray_ends)
 
     if min_rho > 0:
@@ -90,6 +391,226 @@ def visible(sensor, obj_polygon):
 
     return visible_region
 
+def fan_angles(min_angle, max_angle):
+    """
+    generate the ray angles from min_angle to max_angle with step EPSILON
+    :param min_angle:
+    :param max_angle:
+    :return:
+    """
+    angles = []
+    angle = min_angle
+    while angle <= max_angle:
+        angles.append(angle)
+        angle += EPSILON
+    return np.array(angles)
+
+def polygon_edges(obj_polygon):
+    """
+    collect the edges of exterior and interior rings
+    :param obj_polygon:
+    :return: edges in shape (n, 2, 2) - [[x1, y1], [x2, y2]]
+    """
+    rings = [np.array(obj_polygon.exterior.coords)] + [np.array(int_ring.coords) for int_ring in obj_polygon.interiors]
+    return np.concatenate([np.stack([ring[:-1], ring[1:]], axis=1) for ring in rings], axis=0)
+
+class EdgeIndex(object):
+    # uniform grid over the layout edges, shared by all sensors of a model
+    def __init__(self, edges, cell_size=None):
+        start = time.time()
+        self.edges = edges
+
+        points = edges.reshape(-1, 2)
+        self.origin = points.min(axis=0)
+        if cell_size is None:
+            # about one cell per edge
+            cell_size = max(np.max(points.max(axis=0) - self.origin) / np.ceil(np.sqrt(len(edges))), 1e-6)
+        self.cell_size = cell_size
+
+        self.cells = {}
+        lows = self._cell(edges.min(axis=1))
+        highs = self._cell(edges.max(axis=1))
+        for i, ((i0, j0), (i1, j1)) in enumerate(zip(lows, highs)):
+            for ci in range(i0, i1 + 1):
+                for cj in range(j0, j1 + 1):
+                    self.cells.setdefault((ci, cj), []).append(i)
+
+        # timing counters
+        self.build_time = time.time() - start
+        self.query_time = 0.
+        self.query_num = 0
+        self.query_edges = 0
+
+    def _cell(self, points):
+        return np.floor((np.asarray(points) - self.origin) / self.cell_size).astype(int)
+
+    def query(self, center, rho, min_angle=None, max_angle=None):
+        """
+        collect the edges which may be hit by a ray from center within rho and between min_angle and max_angle
+        :param center:          [x0, y0]
+        :param rho:
+        :param min_angle:       None for all directions
+        :param max_angle:
+        :return: edges in shape (k, 2, 2), in the same order as self.edges
+        """
+        start = time.time()
+        x0, y0 = center
+
+        # edges in the cells covered by the bounding box of the disc
+        (i0, j0), (i1, j1) = self._cell([[x0 - rho, y0 - rho], [x0 + rho, y0 + rho]])
+        indices = set()
+        for ci in range(i0, i1 + 1):
+            for cj in range(j0, j1 + 1):
+                indices.update(self.cells.get((ci, cj), ()))
+        indices = np.array(sorted(indices), dtype=int)
+
+        rel = self.edges[indices] - np.array([x0, y0])
+        p1, p2 = rel[:, 0], rel[:, 1]
+        d = p2 - p1
+        cross = p1[:, 0] * p2[:, 1] - p1[:, 1] * p2[:, 0]
+
+        # edges within the disc
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.clip(- (p1 * d).sum(axis=1) / (d * d).sum(axis=1), 0, 1)
+        t[~np.isfinite(t)] = 0
+        nearest = p1 + t[:, None] * d
+        keep = np.sqrt((nearest ** 2).sum(axis=1)) <= rho * (1 + 1e-9)
+
+        # edges within the sector
+        if min_angle is not None and max_angle - min_angle < 2 * np.pi:
+            a1 = np.arctan2(p1[:, 1], p1[:, 0])
+            a2 = np.arctan2(p2[:, 1], p2[:, 0])
+            low = np.where(cross >= 0, a1, a2)
+            width = np.abs(np.arctan2(cross, (p1 * p2).sum(axis=1)))
+            tol = 1e-9
+            overlap = ((low - min_angle) % (2 * np.pi) <= max_angle - min_angle + tol) | \
+                      ((min_angle - low) % (2 * np.pi) <= width + tol)
+            keep &= overlap | (cross == 0)
+
+        edges = self.edges[indices[keep]]
+
+        self.query_time += time.time() - start
+        self.query_num += 1
+        self.query_edges += len(edges)
+        return edges
+
+    def query_sensor(self, sensor):
+        """
+        collect the edges which may block sensor
+        :param sensor:
+        :return:
+        """
+        config = sensor.get_config
+        min_angle, max_angle = sensor.get_FOV
+        if config['isOmini']:
+            min_angle, max_angle = None, None
+        return self.query([config['x'], config['y']], sensor.get_FOD[1], min_angle, max_angle)
+
+def ray_casting_batch(ray_start, ray_ends, edges, max_rho):
+    """
+    cut every ray at its nearest intersection with edges - (rays x edges) version of ray_casting
+    :param ray_start:           [x0, y0]
+    :param ray_ends:            rays ends in shape (m, 2)
+    :param edges:               edges in shape (n, 2, 2)
+    :param max_rho:             length of rays
+    :return: cut ray ends in shape (m, 2)
+    """
+    if len(edges) == 0:
+        return ray_ends
+
+    x1, y1 = ray_start
+    x2, y2 = ray_ends[:, 0:1], ray_ends[:, 1:2]
+    x3, y3 = edges[:, 0, 0], edges[:, 0, 1]
+    x4, y4 = edges[:, 1, 0], edges[:, 1, 1]
+
+    intersect = isIntersect_batch(ray_start, ray_ends, edges)
+
+    # same determinants as line_intersect
+    D1 = x1 * y2 - x2 * y1
+    D2 = x3 * y4 - x4 * y3
+    Dx = D1 * (x3 - x4) - (x1 - x2) * D2
+    Dy = D1 * (y3 - y4) - (y1 - y2) * D2
+    D = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Px = Dx / D
+        Py = Dy / D
+    dist = np.sqrt((Py - y1) ** 2 + (Px - x1) ** 2)
+    dist[~intersect | (dist > max_rho)] = np.inf
+
+    # the last nearest edge wins, as in the sequential scan of visible
+    n = dist.shape[1]
+    nearest = n - 1 - np.argmin(dist[:, ::-1], axis=1)
+    rows = np.arange(len(ray_ends))
+    hit = np.isfinite(dist[rows, nearest])
+
+    cut_ends = ray_ends.copy()
+    cut_ends[hit, 0] = Px[rows, nearest][hit]
+    cut_ends[hit, 1] = Py[rows, nearest][hit]
+    return cut_ends
+
+def contains_points(region, points):
+    """
+    determine whether each point is in region, only points in the bounding box of region are tested
+    :param region:              Polygon or MultiPolygon
+    :param points:              points in shape (n, 2)
+    :return: bool array
+    """
+    inside = np.zeros(len(points), dtype=bool)
+    if region is None or region.is_empty or len(points) == 0:
+        return inside
+
+    min_x, min_y, max_x, max_y = region.bounds
+    xs, ys = points[:, 0], points[:, 1]
+    candidates = np.flatnonzero((xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y))
+    if len(candidates) == 0:
+        return inside
+
+    if contains_xy is not None:
+        inside[candidates] = contains_xy(region, xs[candidates], ys[candidates])
+    else:
+        inside[candidates] = even_odd(region, points[candidates])
+    return inside
+
+def even_odd(region, points):
+    """
+    even-odd rule point in polygon test over all rings of region
+    :param region:              Polygon or MultiPolygon
+    :param points:              points in shape (n, 2)
+    :return: bool array
+    """
+    polygons = getattr(region, 'geoms', [region])
+    edges = np.concatenate([polygon_edges(polygon) for polygon in polygons if not polygon.is_empty], axis=0)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = edges[:, 0, 0], edges[:, 0, 1]
+    x2, y2 = edges[:, 1, 0], edges[:, 1, 1]
+    # edges straddling the horizontal line through the point, crossed on its right
+    straddle = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cross_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = np.sum(straddle & (x < cross_x), axis=1)
+    return crossings % 2 == 1
+
+def isIntersect_batch(start, ends, edges):
+    """
+    determine whether segments [start, end] intersect edges - (ends x edges) version of isIntersect
+    :param start:               [x0, y0]
+    :param ends:                segments ends in shape (m, 2)
+    :param edges:               edges in shape (n, 2, 2)
+    :return: bool array in shape (m, n)
+    """
+    x1, y1 = start
+    x2, y2 = ends[:, 0:1], ends[:, 1:2]
+    x3, y3 = edges[:, 0, 0], edges[:, 0, 1]
+    x4, y4 = edges[:, 1, 0], edges[:, 1, 1]
+
+    # same orientation tests as isIntersect
+    ccw_3 = (x2 - x1) * (y3 - y1) > (y2 - y1) * (x3 - x1)
+    ccw_4 = (x2 - x1) * (y4 - y1) > (y2 - y1) * (x4 - x1)
+    ccw_1 = (x4 - x3) * (y1 - y3) > (y4 - y3) * (x1 - x3)
+    ccw_2 = (x4 - x3) * (y2 - y3) > (y4 - y3) * (x2 - x3)
+    return (ccw_3 != ccw_4) & (ccw_1 != ccw_2)
+
 def distance(start, end):
     """
     generate the distance between point start and end
@@ -0,0 +1,7 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     conftest
+# ======================================================================================================================
+# pytest puts the directory of this file on sys.path, so the tests import the modules of the repository root
@@ -0,0 +1,48 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     test_bitset
+# ======================================================================================================================
+import numpy as np
+import pytest
+from scipy import sparse
+
+from Setter_bitset import BitMatrix, demand, pack, unpack, popcount
+
+
+@pytest.fixture(params=[(30, 1), (40, 64), (50, 130), (25, 200)])
+def cover_matrix(request):
+    # sizes on and off the 64 bit word boundaries
+    m, n = request.param
+    rng = np.random.default_rng(m * n)
+    return (rng.random((m, n)) < 0.2).astype(np.int8), rng
+
+
+def test_pack_unpack(cover_matrix):
+    A, _ = cover_matrix
+    mask = A > 0
+    words = pack(mask)
+    assert words.dtype == np.uint64 and words.shape == (A.shape[0], (A.shape[1] + 63) // 64)
+    assert np.array_equal(unpack(words, A.shape[1]), mask)
+    assert np.array_equal(popcount(words), mask.sum(axis=1))
+
+
+def test_sparse_and_dense_rows(cover_matrix):
+    A, _ = cover_matrix
+    assert np.array_equal(BitMatrix(A).words, BitMatrix(sparse.csr_matrix(A), chunk_size=7).words)
+
+
+@pytest.mark.parametrize('cover_times', [1, 2, 3])
+def test_cover_counts(cover_matrix, cover_times):
+    A, rng = cover_matrix
+    bits = BitMatrix(sparse.csr_matrix(A))
+    # mixed demands, some points need no cover
+    b = rng.integers(0, cover_times + 1, size=A.shape[1]).astype(float)
+    demands = demand(b)
+    for _ in range(10):
+        x = rng.random(A.shape[0]) < 0.3
+        covered = A.T.dot(x.astype(int)) >= np.ceil(b)
+        assert np.array_equal(bits.cover_mask(x, demands), covered)
+        assert bits.count(x, demands) == np.sum(covered)
+        assert np.array_equal(unpack(bits.union(x), A.shape[1]), A.T.dot(x.astype(int)) > 0)
@@ -0,0 +1,71 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     test_max_solvers
+# ======================================================================================================================
+import numpy as np
+import pytest
+from scipy import sparse
+
+from Setter_model import max_solver_dp, max_solver_greedy
+
+
+def dp_reference(A, b, c, C):
+    # the former max_solver_dp, a state of coverage and selection per sensor and budget
+    m = c.shape[0]
+    n = b.shape[0]
+    mat_obj = np.zeros((m, C, n), dtype=int)
+    mat_x = np.zeros((m, C, m), dtype=bool)
+    for i in range(m):
+        for j in range(C):
+            if c[i] <= j:
+                forward_obj = mat_obj[i - 1, int(j - c[i])] + A[i]
+                backward_obj = mat_obj[i - 1, j]
+                forward_sum = (forward_obj - b >= 0).sum()
+                backward_sum = (backward_obj - b >= 0).sum()
+                if forward_sum >= backward_sum:
+                    mat_obj[i, j] = forward_obj
+                    mat_x[i, j] = mat_x[i - 1, int(j - c[i])]
+                    mat_x[i, j, i] = True
+                else:
+                    mat_obj[i, j] = backward_obj
+                    mat_x[i, j] = mat_x[i - 1, j]
+    return mat_x[-1, -1]
+
+
+def covered(A, b, x):
+    # coverage of a selection, the covers of a point are capped at its cover times
+    return np.sum(np.minimum(A.T.dot(x.astype(int)), np.ceil(b)))
+
+
+@pytest.fixture(params=[1, 2])
+def cover_problem(request):
+    rng = np.random.default_rng(request.param)
+    A = sparse.random(60, 80, density=0.1, format='csr', random_state=request.param, data_rvs=np.ones).astype(np.int8)
+    return A, np.full(80, request.param, dtype=float), rng.integers(1, 10, 60).astype(float)
+
+
+@pytest.mark.parametrize('budget', [10, 50, 1000])
+def test_greedy_selects_no_redundant_sensor(cover_problem, budget):
+    A, b, c = cover_problem
+    x = max_solver_greedy(A, b, c, budget)
+    assert np.sum(c[x]) <= budget
+    total = covered(A, b, x)
+    for i in np.flatnonzero(x):
+        without = x.copy()
+        without[i] = False
+        assert covered(A, b, without) < total
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('cover_times', [1, 2])
+@pytest.mark.parametrize('unit, budgets', [(1, [1, 8, 21, 40]), (5, [50, 100, 101])])
+def test_dp_parity(seed, cover_times, unit, budgets):
+    # integer costs, and multiples of a unit reduced by their gcd
+    rng = np.random.default_rng(seed)
+    A = (rng.random((14, 70)) < 0.15).astype(np.int8)
+    b = np.full(70, cover_times, dtype=float)
+    c = (rng.integers(1, 7, 14) * unit).astype(float)
+    for budget in budgets:
+        assert np.array_equal(max_solver_dp(sparse.csr_matrix(A), b, c, budget), dp_reference(A, b, c, budget))
@@ -0,0 +1,92 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     test_nsga_ii
+# ======================================================================================================================
+import numpy as np
+import pytest
+from scipy import sparse
+
+from MOP_algorithms.NSGA_ii import Problem, NSGA_ii, non_dominated_sorting
+from Setter_bitset import unpack
+
+
+def pairwise_sorting(problem, phenotypes, epsilon):
+    # the loops of the former epsilon_non_dominated_sorting, dominated individuals kept in index order
+    num = len(phenotypes)
+    dominated = [[] for _ in range(num)]
+    count = np.zeros(num, dtype=int)
+    for i in range(num):
+        for j in range(num):
+            if problem.epsilon_dominates(phenotypes[i], phenotypes[j], epsilon):
+                dominated[i].append(j)
+            elif problem.epsilon_dominates(phenotypes[j], phenotypes[i], epsilon):
+                count[i] += 1
+
+    ranks = np.full(num, -1)
+    fronts = [[i for i in range(num) if count[i] == 0]]
+    ranks[fronts[0]] = 0
+    while len(fronts[-1]) > 0:
+        front = []
+        for i in fronts[-1]:
+            for j in dominated[i]:
+                count[j] -= 1
+                if count[j] == 0:
+                    ranks[j] = len(fronts)
+                    front.append(j)
+        fronts.append(front)
+    return ranks, fronts
+
+
+@pytest.fixture
+def problem():
+    return Problem(W=sparse.identity(3, dtype=np.int8, format='csr'), b=np.ones(3), c=np.ones(3))
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('epsilon', [(0, 0), (0.1, 1)])
+def test_sorting_parity(problem, seed, epsilon):
+    rng = np.random.default_rng(seed)
+    # integer costs and coarse coverage give ties
+    phenotypes = np.stack([rng.integers(0, 10, 60) / 10, rng.integers(0, 20, 60)], axis=1).astype(float)
+    expected_ranks, expected_fronts = pairwise_sorting(problem, phenotypes, epsilon)
+    ranks, fronts = non_dominated_sorting(phenotypes, epsilon)
+    assert np.array_equal(ranks, expected_ranks)
+    assert [list(front) for front in fronts] == expected_fronts
+
+
+@pytest.fixture
+def cover_problem():
+    rng = np.random.default_rng(0)
+    W = sparse.random(200, 300, density=0.05, format='csr', random_state=1, data_rvs=np.ones).astype(np.int8)
+    return Problem(W=W, b=rng.integers(1, 3, 200).astype(float), c=rng.integers(1, 10, 300).astype(float))
+
+
+@pytest.mark.parametrize('changed', [1, 5, 150])
+@pytest.mark.parametrize('ratio', [0, 1])
+def test_evaluate_changes(cover_problem, changed, ratio):
+    # ratio 0 always falls back to the full product, ratio 1 never does
+    rng = np.random.default_rng(changed)
+    parents = rng.random((40, cover_problem.genotype_num)) < 0.1
+    genotypes = parents.copy()
+    for genotype in genotypes:
+        genotype[rng.choice(cover_problem.genotype_num, changed, replace=False)] ^= True
+    counts, phenotypes = cover_problem.evaluate_changes(genotypes, parents, cover_problem.coverage(parents), ratio)
+    assert np.array_equal(counts, cover_problem.coverage(genotypes))
+    assert np.array_equal(phenotypes, cover_problem.objectives(cover_problem.coverage(genotypes), genotypes))
+
+
+def test_incremental_evolution(cover_problem):
+    populations = []
+    for incremental in (False, True):
+        np.random.seed(0)
+        nsga = NSGA_ii(problem=cover_problem, population_size=40, select_size=5, mutate_size=3,
+                       incremental=incremental)
+        population, _ = nsga.evolve(num_of_generations=10)
+        populations.append(population)
+    assert populations[0].counts is None
+    counts = cover_problem.coverage(unpack(populations[1].genotypes, cover_problem.genotype_num))
+    assert np.array_equal(populations[1].counts, counts)
+    assert np.array_equal(populations[0].genotypes, populations[1].genotypes)
+    assert np.array_equal(populations[0].phenotypes, populations[1].phenotypes)
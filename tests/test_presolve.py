@@ -0,0 +1,47 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     test_presolve
+# ======================================================================================================================
+import numpy as np
+from scipy import sparse
+
+from Setter_presolve import Presolve
+
+
+def cover_matrix(rows, n):
+    indptr = np.cumsum([0] + [len(row) for row in rows])
+    indices = np.concatenate(rows).astype(int)
+    return sparse.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr), shape=(len(rows), n))
+
+
+def test_dominated_sensors_with_long_rows():
+    # rows of hundreds of points, subsets of a base row at no less cost are dropped
+    rng = np.random.default_rng(0)
+    n = 400
+    bases = [np.sort(rng.choice(n, 250, replace=False)) for _ in range(5)]
+    subsets = [np.sort(rng.choice(bases[k % 5], 225, replace=False)) for k in range(20)]
+    A = cover_matrix(bases + subsets, n)
+    c = np.concatenate([np.arange(1, 6), np.arange(20) % 5 + 1 + rng.integers(0, 2, 20)]).astype(float)
+    reduction = Presolve(A, np.ones(n), c, mode='max')
+    assert np.array_equal(reduction.sensors, np.arange(5))
+
+
+def test_implied_points_with_long_columns():
+    # point 0 is covered by 200 sensors, point 1 by 150 of them, the other points by one of them and a sensor of its own
+    rng = np.random.default_rng(1)
+    k = 200
+    rows = [[] for _ in range(2 * k)]
+    for i in range(k):
+        rows[i].append(0)
+    for i in rng.choice(k, 150, replace=False):
+        rows[i].append(1)
+    for i in range(k):
+        rows[i] += [2 + 2 * i, 3 + 2 * i]
+        rows[k + i] += [2 + 2 * i, 3 + 2 * ((i - 1) % k)]
+    n = 2 + 2 * k
+    A = cover_matrix([np.sort(row) for row in rows], n)
+    reduction = Presolve(A, np.ones(n), np.ones(2 * k), mode='min')
+    assert np.array_equal(reduction.points, np.arange(1, n))
+    assert np.array_equal(reduction.sensors, np.arange(2 * k))
@@ -0,0 +1,73 @@
+# ======================================================================================================================
+# author:   agent
+# date:     18 Oct. 2026
+# email:    agent@local
+# name:     test_visible
+# ======================================================================================================================
+import numpy as np
+import pytest
+
+from Setter_sensors import Sensors
+from Setter_visible import visible, visible_vectorized, polygon_edges, EdgeIndex, clip, discrete, contains_points
+from Setter_model import cover_row, cover_rows
+import sample.Setter_sample as small_layout
+import sample.Setter_layout as large_layout
+
+# layout, grid size, max distance and min distance of candidates; all sensors of 3 or 4 locations of each layout are
+# checked, so that sensors share their location
+LAYOUTS = {'sample': (small_layout, 0.5, 1, 0.5), 'layout': (large_layout, 2, 4, 1)}
+
+
+@pytest.fixture(scope='module', params=sorted(LAYOUTS))
+def layout(request):
+    module, grid_size, max_dist, min_dist = LAYOUTS[request.param]
+    sensors = Sensors()
+    sensors.generate_configs(module.SENSOR_TYPES, clip(module.OBJ_POLYGON.buffer(-0.1, 0), max_dist, min_dist), 4)
+    locations = {}
+    for sensor in sensors.get_sensors:
+        locations.setdefault((sensor.x, sensor.y), []).append(sensor)
+    locations = list(locations.values())
+    points = discrete(module.OBJ_POLYGON, grid_size)
+    return module.OBJ_POLYGON, sum(locations[::max(1, len(locations) // 3)], []), points
+
+
+def scalar_rows(obj_polygon, sensors, points):
+    return [contains_points(visible(sensor, obj_polygon), points) for sensor in sensors]
+
+
+def test_vectorized_rows(layout):
+    obj_polygon, sensors, points = layout
+    rows = [contains_points(visible_vectorized(sensor, obj_polygon), points) for sensor in sensors]
+    for expected, row in zip(scalar_rows(obj_polygon, sensors, points), rows):
+        assert np.array_equal(expected, row)
+
+
+def test_vectorized_rows_with_edge_index(layout):
+    obj_polygon, sensors, points = layout
+    edge_index = EdgeIndex(polygon_edges(obj_polygon))
+    rows = [contains_points(visible_vectorized(sensor, obj_polygon, edge_index.query_sensor(sensor)), points)
+            for sensor in sensors]
+    for expected, row in zip(scalar_rows(obj_polygon, sensors, points), rows):
+        assert np.array_equal(expected, row)
+
+
+def test_vectorized_regions(layout):
+    obj_polygon, sensors, _ = layout
+    for sensor in sensors:
+        expected, region = visible(sensor, obj_polygon), visible_vectorized(sensor, obj_polygon)
+        if expected is None or region is None:
+            assert expected is None and region is None
+        else:
+            assert expected.symmetric_difference(region).area <= 1e-6 * max(expected.area, 1)
+
+
+def test_direct_rows(layout):
+    obj_polygon, sensors, points = layout
+    edge_index = EdgeIndex(polygon_edges(obj_polygon))
+    # shared location profiles, single sensors through visible_points, against the exact sweep region
+    assert len({(sensor.x, sensor.y) for sensor in sensors}) < len(sensors)
+    for group in (sensors, sensors[:1]):
+        rows = cover_rows(group, obj_polygon, points, edge_index, 'direct')
+        for sensor, row in zip(group, rows):
+            assert np.array_equal(row, np.flatnonzero(cover_row(sensor, obj_polygon, points, edge_index, 'sweep')))
+            assert np.array_equal(row, np.flatnonzero(cover_row(sensor, obj_polygon, points, edge_index, 'direct')))